@@ -0,0 +1,57 @@
+"""
+プロファイル設定モジュール
+
+複数のVault・ユーザーを1プロセスでレビューするための設定ファイルを読み込む
+"""
+import json
+from typing import List
+
+from pydantic import BaseModel, Field
+
+from config.settings import settings
+
+
+class Profile(BaseModel):
+    """1人分（1 Vault分）のレビュー設定"""
+
+    # 状態ファイルのディレクトリ名にも使うため、パスの区切りや先頭の「.」は許可しない
+    name: str = Field(min_length=1, max_length=64, pattern=r"^\w[\w.-]*$")
+    vault_path: str
+
+    # 未設定の項目は.envの設定を使用
+    openai_api_key: str = ""
+    openai_model: str = ""
+    line_channel_access_token: str = ""
+    line_user_id: str = ""
+
+    # このプロファイルのAPI呼び出し上限（回/分）
+    requests_per_minute: int = Field(default=20, gt=0)
+
+    def resolved_api_key(self) -> str:
+        return self.openai_api_key or settings.openai_api_key
+
+    def resolved_model(self) -> str:
+        return self.openai_model or settings.openai_model
+
+    def resolved_line_token(self) -> str:
+        return self.line_channel_access_token or settings.line_channel_access_token
+
+
+def load_profiles(path: str) -> List[Profile]:
+    """
+    プロファイル設定ファイル（JSON）を読み込む
+
+    形式:
+        {"profiles": [{"name": "koike", "vault_path": "...", "line_user_id": "..."}, ...]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    profiles = [Profile(**item) for item in data.get("profiles", [])]
+
+    names = [profile.name for profile in profiles]
+    duplicates = {name for name in names if names.count(name) > 1}
+    if duplicates:
+        raise ValueError(f"プロファイル名が重複しています: {sorted(duplicates)}")
+
+    return profiles
@@ -4,11 +4,15 @@
 環境変数から設定を読み込み、アプリケーション全体で使用する
 """
 import os
+from pathlib import Path
 from dotenv import load_dotenv
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
 
 load_dotenv()
 
+# DAILY_HEURISTICS に指定できる値
+DAILY_HEURISTICS_MODES = ("auto", "always", "off")
+
 
 class Settings(BaseModel):
     """アプリケーション設定"""
@@ -20,13 +24,61 @@ class Settings(BaseModel):
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
     openai_model: str = os.getenv("OPENAI_MODEL", "gpt-4o")
 
-    # ログ設定
+    # プロンプトのトークン予算（超過したセクションは圧縮される）
+    prompt_token_budget: int = int(os.getenv("PROMPT_TOKEN_BUDGET", "4000"))
+
+    # 週報パースの上限（超過した場合は切り詰め・縮退してジョブを止めない）
+    max_report_bytes: int = int(os.getenv("MAX_REPORT_BYTES", str(2 * 1024 * 1024)))
+    max_line_chars: int = int(os.getenv("MAX_LINE_CHARS", "20000"))
+    parse_deadline_seconds: float = float(os.getenv("PARSE_DEADLINE_SECONDS", "5"))
+
+    # API利用予算（USD、0なら無制限）。超過しそうな場合は安いモデル・圧縮・平日チェックのスキップで縮退する
+    daily_budget_usd: float = float(os.getenv("DAILY_BUDGET_USD", "0"))
+    monthly_budget_usd: float = float(os.getenv("MONTHLY_BUDGET_USD", "0"))
+    budget_fallback_model: str = os.getenv("BUDGET_FALLBACK_MODEL", "gpt-4o-mini")
+
+    # 平日チェックのローカルルール（auto: 定型のリマインドはAPIを呼ばずに作成し、気になる兆候があればAPIでチェック /
+    # always: 新テンプレートの平日チェックは常にローカルで作成 / off: 常にAPIでチェック）
+    daily_heuristics: str = Field(default=os.getenv("DAILY_HEURISTICS", "auto"), validate_default=True)
+
+    # API利用量の台帳（未設定の場合は STATE_DIR/usage.sqlite3）
+    usage_db: str = os.getenv("USAGE_DB", "")
+
+    # 同じ週のレビューが重なった場合に、先行する実行の完了を待つ最大時間（秒）と、
+    # 直前に完了した結果を再利用する期間（秒、0なら実行中だった結果のみ再利用）
+    run_lock_timeout_seconds: float = float(os.getenv("RUN_LOCK_TIMEOUT_SECONDS", "600"))
+    run_reuse_seconds: float = float(os.getenv("RUN_REUSE_SECONDS", "0"))
+
+    # 状態ファイル（前回分析のスナップショットなど）の保存先
+    state_dir: str = os.getenv("STATE_DIR", str(Path(__file__).parent.parent / "state"))
+
+    # 複数プロファイル実行の設定
+    profiles_file: str = os.getenv("PROFILES_FILE", "")
+    global_requests_per_minute: int = int(os.getenv("GLOBAL_REQUESTS_PER_MINUTE", "60"))
+    scheduler_file_workers: int = int(os.getenv("SCHEDULER_FILE_WORKERS", "2"))
+    scheduler_api_workers: int = int(os.getenv("SCHEDULER_API_WORKERS", "8"))
+
+    # ログ設定（ファイルはサイズ・日付でローテーションし、古いものはgzipで圧縮）
     log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "text")
+    log_max_bytes: int = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    log_backup_count: int = int(os.getenv("LOG_BACKUP_COUNT", "14"))
 
     # LINE Messaging API設定
     line_channel_access_token: str = os.getenv("LINE_CHANNEL_ACCESS_TOKEN", "")
     line_user_id: str = os.getenv("LINE_USER_ID", "")
 
+    @field_validator("daily_heuristics")
+    @classmethod
+    def _check_daily_heuristics(cls, value: str) -> str:
+        # 大文字・空白の揺れは許容し、それ以外の値は起動時にエラーにする（黙ってautoとして動かさない）
+        normalized = value.strip().lower()
+        if normalized not in DAILY_HEURISTICS_MODES:
+            raise ValueError(
+                f"DAILY_HEURISTICS は {', '.join(DAILY_HEURISTICS_MODES)} のいずれかを指定してください: {value!r}"
+            )
+        return normalized
+
 
 # グローバル設定インスタンス
 settings = Settings()
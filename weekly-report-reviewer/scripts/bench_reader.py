@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+週報の部分読み込みのベンチマーク
+
+必要なセクションの後ろに貼り付けたログやbase64の埋め込み画像がある数MBの週報を生成し、
+ファイル全体を読み込む従来の方法と、PartialReaderによる部分読み込みとで
+処理時間とピークメモリ（tracemalloc）を比較する。
+あわせて、両者のサマリが一致することを確認する。
+
+使い方:
+    python3 scripts/bench_reader.py
+    python3 scripts/bench_reader.py --sizes 1 5 20 --repeat 5
+"""
+import sys
+import time
+import base64
+import random
+import logging
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.parse_guard import ParseGuard
+from src.vault_reader import VaultReader, WeeklyReport
+
+REPORT = """# 2026-W42 週報
+
+## 今週のフォーカス（1つだけ）
+> 週報AIアプリを完成させる
+
+## デイリーログ
+| 日 | やったこと・気づき | 調子 |
+|----|------------------|------|
+| 月 | 設計を見直した | 4/5 |
+| 火 | パーサを書いた | 3/5 |
+| 水 | テストを書いた | 4/5 |
+
+## 振り返り（各1文でOK）
+1. **一番の成果は？** → パーサの高速化
+2. **なぜうまくいった？** → 計測から始めた
+3. **一番の障害は？** → 会議
+4. **どう乗り越える？** → 午前を集中時間にする
+
+## KPT
+- **Keep（続ける）**: 朝の集中時間
+- **Problem（課題）**: 会議が多い
+- **Try（来週試す）**: 会議を午後にまとめる
+
+## 前週からの引き継ぎ
+- 会議を減らす
+
+## AIサマリ
+<!-- AI自動生成 -->
+
+---
+
+## 年度目標（2026）
+- とにかくプロダクトをたくさん出す
+
+"""
+
+
+def gen_pasted_log(size: int) -> str:
+    """必要なセクションの後ろに貼り付けた大量のログ"""
+    rng = random.Random(0)
+    lines = ["## 貼り付けログ", "```"]
+    total = 0
+    while total < size:
+        line = f"2026-10-14 12:{rng.randrange(60):02d}:{rng.randrange(60):02d} INFO request id={rng.getrandbits(64):x}"
+        lines.append(line)
+        total += len(line) + 1
+    lines.append("```")
+    return REPORT + "\n".join(lines) + "\n"
+
+
+def gen_embedded_image(size: int) -> str:
+    """base64で埋め込んだ画像（1行が数MB）"""
+    payload = base64.b64encode(random.Random(1).randbytes(size * 3 // 4)).decode("ascii")
+    return REPORT + f"## メモ\n![screenshot](data:image/png;base64,{payload})\n"
+
+
+GENERATORS = [gen_pasted_log, gen_embedded_image]
+
+
+def read_full(file_path: str, guard: ParseGuard) -> WeeklyReport:
+    """従来の方法（ファイル全体を読み込んでからパース）"""
+    with open(file_path, "r", encoding="utf-8") as f:
+        content = f.read()
+    report, _ = guard.parse(lambda text: VaultReader._build_report(file_path, text), content)
+    return report
+
+
+def measure(func, repeat: int):
+    """(最短の処理時間[秒], ピークメモリ[バイト], 戻り値)"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="週報の部分読み込みのベンチマーク")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 5, 20], help="生成する週報のサイズ（MB）")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # 切り詰めの警告ログは計測のたびに出るため抑制する
+    logging.disable(logging.WARNING)
+
+    failures = 0
+    # 従来の方法もサイズ上限で切り詰められないよう、上限を外して比較する
+    guard = ParseGuard(max_bytes=0, max_line_chars=0, deadline_seconds=0)
+
+    print(f"{'入力':<22}{'サイズ':>9}  {'全体読み込み':>22}  {'部分読み込み':>22}  一致")
+    with tempfile.TemporaryDirectory() as tmp:
+        reader = VaultReader(tmp)
+
+        for generator in GENERATORS:
+            for size_mb in args.sizes:
+                file_path = str(Path(tmp) / "2026-W42.md")
+                Path(file_path).write_text(generator(int(size_mb * 1024 * 1024)), encoding="utf-8")
+                nbytes = Path(file_path).stat().st_size
+
+                full_time, full_peak, full = measure(lambda: read_full(file_path, guard), args.repeat)
+                part_time, part_peak, part = measure(lambda: reader.read_weekly_report(file_path), args.repeat)
+
+                same = full.get_summary() == part.get_summary()
+                failures += 0 if same else 1
+
+                print(
+                    f"{generator.__name__:<22}{nbytes / 1024 / 1024:>7.1f}MB  "
+                    f"{full_time * 1000:>8.1f}ms {full_peak / 1024 / 1024:>8.2f}MB peak  "
+                    f"{part_time * 1000:>8.1f}ms {part_peak / 1024 / 1024:>8.2f}MB peak  "
+                    f"{'OK' if same else 'NG'}"
+                )
+
+    print(f"\n失敗: {failures}件")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+プロンプト・モデルのオフラインA/B評価
+
+週報のコーパスをプロンプト・モデルのバリアントごとに並列に再生し、
+レイテンシ（p50/p95）・トークン数・JSONとして有効な割合・フィールドの充足率を並べて比較する。
+
+回答の取得元:
+  - stub:     ネットワークを使わずスタブ回答を返す（プロンプトのトークン数の比較・動作確認用）
+  - recorded: 記録済みの回答（--record で保存したJSONL）を再生する
+  - live:     OpenAI APIを呼び出す（--record で回答を保存すれば、以降はrecordedで再現できる）
+
+使い方:
+    python3 scripts/evaluate_prompts.py --variants scripts/eval_variants.example.json --source stub
+    python3 scripts/evaluate_prompts.py --variants variants.json --source live --record /tmp/eval.jsonl
+    python3 scripts/evaluate_prompts.py --variants variants.json --source recorded --responses /tmp/eval.jsonl
+
+バリアントの形式（JSON）:
+    {"variants": [
+        {"name": "baseline"},
+        {"name": "mini", "model": "gpt-4o-mini", "prompt_token_budget": 2000,
+         "system_prompts": {"daily": "..."}}
+    ]}
+"""
+import sys
+import json
+import math
+import time
+import logging
+import argparse
+import threading
+import unicodedata
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from config.settings import settings
+from src.analyzer import WeeklyReportAnalyzer
+from src.schemas import RESULT_MODELS, stub_result, validate_partial
+from src.usage_ledger import UsageLedger, estimate_cost
+from src.vault_reader import VaultReader
+
+
+class StubSource:
+    """スタブ回答を返す（トークン数は推定値）"""
+
+    def respond(self, variant: Dict, analyzer: WeeklyReportAnalyzer, report: str, kind: str,
+                messages: List[Dict]) -> Dict:
+        content = json.dumps(stub_result(kind), ensure_ascii=False)
+        return {"content": content, "latency": 0.0, "usage": None}
+
+
+class RecordedSource:
+    """記録済みの回答を再生する（バリアント名・週報・結果種別で対応付け）"""
+
+    def __init__(self, responses_file: str):
+        self.responses = {}
+        with open(responses_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    self.responses[(record["variant"], record["report"], record["kind"])] = record
+
+    def respond(self, variant: Dict, analyzer: WeeklyReportAnalyzer, report: str, kind: str,
+                messages: List[Dict]) -> Dict:
+        record = self.responses.get((variant["name"], report, kind))
+        if record is None:
+            raise KeyError(f"記録済みの回答がありません: {variant['name']} / {report} / {kind}")
+        return record
+
+
+class LiveSource:
+    """OpenAI APIを呼び出す（利用量は評価用の台帳に記録し、本番の予算には含めない）"""
+
+    def respond(self, variant: Dict, analyzer: WeeklyReportAnalyzer, report: str, kind: str,
+                messages: List[Dict]) -> Dict:
+        started = time.monotonic()
+        response = analyzer.client.chat.completions.create(
+            model=analyzer.model,
+            messages=messages,
+            response_format={"type": "json_object"},
+        )
+        latency = time.monotonic() - started
+        analyzer.record_usage(kind, response.usage, latency)
+
+        usage = response.usage
+        return {
+            "content": response.choices[0].message.content,
+            "latency": latency,
+            "usage": {
+                "prompt_tokens": usage.prompt_tokens,
+                "completion_tokens": usage.completion_tokens,
+            } if usage else None,
+        }
+
+
+def build_messages(analyzer: WeeklyReportAnalyzer, variant: Dict, summary: Dict, is_weekend: bool):
+    """バリアントのプロンプトを組み立てる（system_promptsで結果種別ごとに差し替え可能）"""
+    kind, system_prompt, user_prompt = analyzer.build_prompt(summary, is_weekend)
+    system_prompt = variant.get("system_prompts", {}).get(kind, system_prompt)
+    return kind, [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt},
+    ]
+
+
+def evaluate_one(source, variant: Dict, analyzer: WeeklyReportAnalyzer, report: str, summary: Dict,
+                 is_weekend: bool) -> Dict:
+    """1週報・1バリアント分を評価"""
+    kind, messages = build_messages(analyzer, variant, summary, is_weekend)
+    estimator = analyzer.budgeter.estimator
+
+    try:
+        response = source.respond(variant, analyzer, report, kind, messages)
+    except Exception as e:
+        return {"variant": variant["name"], "report": report, "kind": kind, "error": str(e)}
+
+    content = response.get("content") or ""
+    usage = response.get("usage") or {
+        "prompt_tokens": sum(estimator.count(message["content"]) for message in messages),
+        "completion_tokens": estimator.count(content),
+    }
+
+    try:
+        raw = json.loads(content)
+    except (TypeError, ValueError):
+        raw = None
+    json_valid = isinstance(raw, dict)
+    if not json_valid:
+        raw = {}
+
+    fields = RESULT_MODELS[kind].model_fields
+    _, missing = validate_partial(kind, raw)
+
+    return {
+        "variant": variant["name"],
+        "report": report,
+        "kind": kind,
+        "content": content,
+        "latency": response.get("latency", 0.0),
+        "usage": usage,
+        "json_valid": json_valid,
+        "completeness": (len(fields) - len(missing)) / len(fields),
+        "complete": not missing,
+        "cost": estimate_cost(analyzer.model, usage["prompt_tokens"], usage["completion_tokens"]),
+    }
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(math.ceil(p * len(ordered) / 100) - 1, 0)
+    return ordered[index]
+
+
+def aggregate(results: List[Dict]) -> Dict:
+    """バリアントごとの指標を集計"""
+    ok = [result for result in results if "error" not in result]
+    latencies = [result["latency"] for result in ok]
+    count = len(ok) or 1
+
+    return {
+        "runs": len(results),
+        "errors": len(results) - len(ok),
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "prompt_tokens": sum(result["usage"]["prompt_tokens"] for result in ok) / count,
+        "completion_tokens": sum(result["usage"]["completion_tokens"] for result in ok) / count,
+        "json_valid_rate": sum(result["json_valid"] for result in ok) / count,
+        "completeness": sum(result["completeness"] for result in ok) / count,
+        "complete_rate": sum(result["complete"] for result in ok) / count,
+        "cost_per_run": sum(result["cost"] for result in ok) / count,
+    }
+
+
+def _ljust(text: str, width: int) -> str:
+    """全角文字を2桁として左寄せ"""
+    used = sum(2 if unicodedata.east_asian_width(char) in "WF" else 1 for char in text)
+    return text + " " * max(width - used, 0)
+
+
+def print_table(summary: Dict[str, Dict]) -> None:
+    """バリアントごとの指標を横に並べて表示"""
+    rows = [
+        ("実行数", "runs", "{:.0f}"),
+        ("エラー", "errors", "{:.0f}"),
+        ("p50レイテンシ(秒)", "latency_p50", "{:.2f}"),
+        ("p95レイテンシ(秒)", "latency_p95", "{:.2f}"),
+        ("入力トークン(平均)", "prompt_tokens", "{:.0f}"),
+        ("出力トークン(平均)", "completion_tokens", "{:.0f}"),
+        ("JSON有効率", "json_valid_rate", "{:.1%}"),
+        ("フィールド充足率", "completeness", "{:.1%}"),
+        ("再要求なしの割合", "complete_rate", "{:.1%}"),
+        ("推定コスト/回(USD)", "cost_per_run", "{:.5f}"),
+    ]
+    names = list(summary)
+    width = max([14] + [len(name) + 2 for name in names])
+
+    print(_ljust("指標", 22) + "".join(f"{name:>{width}}" for name in names))
+    for label, key, fmt in rows:
+        print(_ljust(label, 22) + "".join(f"{fmt.format(summary[name][key]):>{width}}" for name in names))
+
+
+def load_corpus(paths: List[str]) -> List[str]:
+    """週報ファイルの一覧（ディレクトリはVault内の週報をすべて対象にする）"""
+    files = []
+    for path in paths:
+        if Path(path).is_dir():
+            files.extend(VaultReader(path).list_weekly_files())
+        else:
+            files.append(path)
+    return files
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="プロンプト・モデルのオフラインA/B評価")
+    parser.add_argument("corpus", nargs="*", help="週報ファイルまたはディレクトリ（省略時はVAULT_PATH）")
+    parser.add_argument("--variants", required=True, metavar="JSON", help="バリアント定義ファイル")
+    parser.add_argument("--source", choices=["stub", "recorded", "live"], default="stub")
+    parser.add_argument("--responses", metavar="JSONL", help="recordedで再生する回答")
+    parser.add_argument("--record", metavar="JSONL", help="取得した回答を保存する（recordedで再生可能）")
+    parser.add_argument("--mode", choices=["daily", "weekend", "both"], default="both")
+    parser.add_argument("--workers", type=int, default=4, help="並列数")
+    parser.add_argument("--json", metavar="FILE", help="集計結果をJSONで保存")
+    parser.add_argument("--usage-db", metavar="SQLITE",
+                        help="liveの利用量を記録する台帳（省略時は STATE_DIR/eval_usage.sqlite3、本番の台帳とは分ける）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s - %(message)s")
+
+    with open(args.variants, "r", encoding="utf-8") as f:
+        variants = json.load(f)["variants"]
+
+    if args.source == "recorded":
+        if not args.responses:
+            parser.error("--source recorded には --responses が必要です")
+        source = RecordedSource(args.responses)
+    elif args.source == "live":
+        source = LiveSource()
+    else:
+        source = StubSource()
+
+    files = load_corpus(args.corpus or [settings.vault_path])
+    reports = []
+    for file_path in files:
+        report = VaultReader(str(Path(file_path).parent)).read_weekly_report(file_path)
+        if report is not None:
+            reports.append((Path(file_path).stem, report.get_summary()))
+
+    if not reports:
+        print("評価対象の週報がありません")
+        return 1
+
+    modes = {"daily": [False], "weekend": [True], "both": [False, True]}[args.mode]
+    # 評価の呼び出しで本番の日次・月次予算を消費しないよう、予算なしの別の台帳に記録する
+    ledger = UsageLedger(args.usage_db or str(Path(settings.state_dir) / "eval_usage.sqlite3"), profile="eval")
+    analyzers = {
+        variant["name"]: WeeklyReportAnalyzer(
+            model=variant.get("model"),
+            ledger=ledger,
+            token_budget=variant.get("prompt_token_budget"),
+        )
+        for variant in variants
+    }
+
+    print(f"{len(reports)}件の週報 × {len(variants)}バリアント × {len(modes)}モードを評価します（{args.source}）\n")
+
+    results: Dict[str, List[Dict]] = {variant["name"]: [] for variant in variants}
+    lock = threading.Lock()
+    record_file = open(args.record, "w", encoding="utf-8") if args.record else None
+
+    def run(variant, report, summary, is_weekend):
+        result = evaluate_one(source, variant, analyzers[variant["name"]], report, summary, is_weekend)
+        with lock:
+            results[variant["name"]].append(result)
+            if record_file and "error" not in result:
+                record_file.write(json.dumps({
+                    key: result[key] for key in ("variant", "report", "kind", "content", "latency", "usage")
+                }, ensure_ascii=False) + "\n")
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            futures = [
+                pool.submit(run, variant, report, summary, is_weekend)
+                for variant in variants
+                for report, summary in reports
+                for is_weekend in modes
+            ]
+            for future in futures:
+                future.result()
+    finally:
+        if record_file:
+            record_file.close()
+
+    summary = {name: aggregate(items) for name, items in results.items()}
+    print_table(summary)
+
+    for name, items in results.items():
+        for item in items:
+            if "error" in item:
+                print(f"\nエラー [{name}] {item['report']} ({item['kind']}): {item['error']}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+パーサー・ライターの最悪ケース入力ファジング＆ベンチマーク
+
+病的な週報（大量の「- 」行、終端のないセクション、長大な空白や区切り記号など）を
+ランダムに生成し、以下を検証する：
+  - パース・サマリ生成・セクション置換が例外を出さないこと
+  - セクション置換を2回行っても結果が変わらないこと（冪等性）
+  - 1バイトあたりの処理時間が上限以下で、入力サイズに対してほぼ線形であること
+
+使い方:
+    python3 scripts/fuzz_parser.py                # 既定のサイズ・試行回数で実行
+    python3 scripts/fuzz_parser.py --max-bytes 2000000 --seed 42
+"""
+import re
+import sys
+import time
+import random
+import logging
+import argparse
+from functools import partial
+from pathlib import Path
+
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.parse_guard import ParseGuard
+from src.vault_reader import VaultReader, WeeklyReport
+from src.writer import MarkdownWriter
+
+
+def _repeat_to(unit: str, size: int) -> str:
+    return unit * max(size // max(len(unit.encode("utf-8")), 1), 1)
+
+
+def gen_dash_lines(rng: random.Random, size: int) -> str:
+    """KPTに大量の「- 」行"""
+    body = _repeat_to("- " + " " * rng.randint(0, 5) + "\n", size)
+    return f"## KPT\n- **Keep（続ける）**: {body}- **Try（来週試す）**: x\n## AIサマリ\n"
+
+
+def gen_unterminated_sections(rng: random.Random, size: int) -> str:
+    """終端の見出しがない巨大なセクション"""
+    word = rng.choice(["あ", "a", "■", "#", "-", ">"])
+    return "## 今週のフォーカス\n>" + _repeat_to(word, size)
+
+
+def gen_table_whitespace(rng: random.Random, size: int) -> str:
+    """デイリーログの行内に長大な空白と区切り記号"""
+    filler = rng.choice([" ", " |", "| ", "\t"])
+    return "## デイリーログ\n| 月 | " + _repeat_to(filler, size) + "x\n## KPT\n"
+
+
+def gen_many_headings(rng: random.Random, size: int) -> str:
+    """見出しに似た行が大量にある"""
+    unit = rng.choice(["## \n", "■\n", "##AIサマリ\n", "---\n", "## AIサマリ\n"])
+    return "## AIサマリ\n" + _repeat_to(unit, size)
+
+
+def gen_v1_markers(rng: random.Random, size: int) -> str:
+    """旧テンプレートの記号が大量に並ぶ"""
+    return "■AIからの総括（振り返り）\n" + _repeat_to(rng.choice(["■", "\n-", "▼", "-\n"]), size)
+
+
+def gen_random_mix(rng: random.Random, size: int) -> str:
+    """テンプレートの断片をランダムに連結"""
+    fragments = [
+        "## 今週のフォーカス（1つだけ）\n> ", "## デイリーログ\n", "| 月 | ", " | 3/5 |\n",
+        "## KPT\n", "- **Keep（続ける）**: ", "- **Try（来週試す）**:", "\n", "---\n",
+        "## AIサマリ\n", "■今週のToDo\n", "- [x] ", "- [ ] ", "あいうえお", " " * 50, "|", "-",
+    ]
+    parts = []
+    total = 0
+    while total < size:
+        fragment = rng.choice(fragments)
+        parts.append(fragment)
+        total += len(fragment.encode("utf-8"))
+    return "".join(parts)
+
+
+GENERATORS = [
+    gen_dash_lines,
+    gen_unterminated_sections,
+    gen_table_whitespace,
+    gen_many_headings,
+    gen_v1_markers,
+    gen_random_mix,
+]
+
+
+def run_once(content: str) -> float:
+    """パース・サマリ生成・セクション置換を実行し、所要時間を返す"""
+    started = time.perf_counter()
+
+    report = WeeklyReport("fuzz.md", content)
+    summary = report.get_summary()
+    assert isinstance(summary["daily_log"]["entries"], list)
+
+    grammar = report.grammar
+    once = MarkdownWriter._replace_section(content, grammar, grammar.ai_summary_key, "AI")
+    twice = MarkdownWriter._replace_section(once, grammar, grammar.ai_summary_key, "AI")
+    assert once == twice, "セクション置換が冪等ではありません"
+
+    return time.perf_counter() - started
+
+
+def _slow_build(text: str) -> WeeklyReport:
+    """長い本文では制限時間を超えるbuild（子プロセスに渡すためモジュールレベルに置く）"""
+    if len(text) > 1000:
+        time.sleep(2)
+    return VaultReader._build_report("guard.md", text)
+
+
+def _backtracking_build(text: str) -> WeeklyReport:
+    """GILを手放さない正規表現の破滅的バックトラックで止まるbuild"""
+    if text:
+        re.match(r"(a+)+$", "a" * 27 + "b")
+    return VaultReader._build_report("guard.md", text)
+
+
+def check_guard() -> int:
+    """実行時ガードがサイズ上限・制限時間で縮退することを確認"""
+    failures = 0
+    content = "## 今週のフォーカス\n> x\n" + "あ" * 100_000
+
+    report, degraded = ParseGuard(max_bytes=10_000, deadline_seconds=5).parse(
+        partial(VaultReader._build_report, "guard.md"), content
+    )
+    kept_bytes = sum(len(body.encode("utf-8")) for body in report.sections.values())
+    if not degraded or kept_bytes > 10_000:
+        print("NG サイズ上限で切り詰められませんでした")
+        failures += 1
+
+    for build in (_slow_build, _backtracking_build):
+        started = time.perf_counter()
+        _, degraded = ParseGuard(max_bytes=0, max_line_chars=0, deadline_seconds=0.2).parse(build, content)
+        elapsed = time.perf_counter() - started
+        if not degraded or elapsed > 2.0:
+            print(f"NG 制限時間で縮退しませんでした（{build.__name__}: {elapsed:.2f}秒）")
+            failures += 1
+
+    print(f"{'OK' if not failures else 'NG'} 実行時ガード")
+    return failures
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="パーサー・ライターの最悪ケース入力ファジング")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trials", type=int, default=5, help="ジェネレータごとの試行回数")
+    parser.add_argument("--min-bytes", type=int, default=20_000)
+    parser.add_argument("--max-bytes", type=int, default=1_000_000)
+    parser.add_argument("--max-us-per-byte", type=float, default=5.0, help="1バイトあたりの処理時間の上限（マイクロ秒）")
+    parser.add_argument("--max-growth", type=float, default=4.0, help="最小サイズに対する1バイトあたり時間の増加率の上限")
+    args = parser.parse_args()
+
+    # セクションの追記などの警告ログは大量に出るため抑制する
+    logging.disable(logging.WARNING)
+
+    rng = random.Random(args.seed)
+    failures = check_guard()
+
+    for generator in GENERATORS:
+        for trial in range(args.trials):
+            trial_seed = rng.randrange(2 ** 32)
+            timings = {}
+
+            for size in (args.min_bytes, args.max_bytes):
+                content = generator(random.Random(trial_seed), size)
+                nbytes = len(content.encode("utf-8"))
+                try:
+                    timings[size] = run_once(content) / nbytes * 1e6
+                except AssertionError as e:
+                    print(f"NG {generator.__name__} seed={trial_seed}: {e}")
+                    failures += 1
+                    break
+
+            if len(timings) < 2:
+                continue
+
+            small, large = timings[args.min_bytes], timings[args.max_bytes]
+            growth = large / small if small > 0 else 1.0
+            ok = large <= args.max_us_per_byte and growth <= args.max_growth
+            failures += 0 if ok else 1
+
+            print(
+                f"{'OK' if ok else 'NG'} {generator.__name__:<28} seed={trial_seed:<10} "
+                f"{large:.3f}us/byte (増加率 x{growth:.1f})"
+            )
+
+    print(f"\n失敗: {failures}件")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
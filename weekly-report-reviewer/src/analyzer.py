@@ -2,40 +2,243 @@
 OpenAI APIを使用して週報を分析するモジュール
 """
 import json
+import time
 import logging
 from datetime import datetime
-from typing import Dict
+from typing import Dict, List, Optional, Sequence, Tuple
 from openai import OpenAI
 from config.settings import settings
+from src.daily_heuristics import evaluate_daily
+from src.rate_limiter import RateLimiter
+from src.schemas import describe_fields, validate_partial
+from src.snapshot_store import SnapshotStore, compute_delta, is_empty_delta
+from src.token_budget import TokenBudgeter, TokenEstimator
+from src.usage_ledger import UsageLedger, default_db_path, estimate_cost
 
 logger = logging.getLogger(__name__)
 
+# 予算判定で見込む出力トークン数（結果種別ごと）
+EXPECTED_COMPLETION_TOKENS = {
+    "daily": 200,
+    "weekend_v1": 900,
+    "weekend_v2": 900,
+}
+
 
 class WeeklyReportAnalyzer:
     """週報を分析するクラス"""
 
-    def __init__(self):
-        self.client = OpenAI(api_key=settings.openai_api_key)
-        self.model = settings.openai_model
-
-    def analyze(self, report_summary: Dict, is_weekend: bool = False) -> Dict:
+    def __init__(self, snapshot_store: Optional[SnapshotStore] = None, client: Optional[OpenAI] = None,
+                 model: Optional[str] = None, rate_limiters: Sequence[RateLimiter] = (),
+                 ledger: Optional[UsageLedger] = None, token_budget: Optional[int] = None):
+        self.snapshot_store = snapshot_store or SnapshotStore(settings.state_dir)
+        self._client = client
+        self.model = model or settings.openai_model
+        self.rate_limiters = rate_limiters
+        self.ledger = ledger or UsageLedger(
+            default_db_path(),
+            daily_budget=settings.daily_budget_usd,
+            monthly_budget=settings.monthly_budget_usd,
+        )
+        self.budgeter = TokenBudgeter(
+            token_budget or settings.prompt_token_budget,
+            TokenEstimator(self.model)
+        )
+
+    @property
+    def client(self) -> OpenAI:
+        """OpenAIクライアント（APIを呼ぶまで生成しない）"""
+        if self._client is None:
+            self._client = OpenAI(api_key=settings.openai_api_key)
+        return self._client
+
+    def analyze(self, report_summary: Dict, is_weekend: bool = False) -> Optional[Dict]:
         """
         週報を分析
 
+        平日チェックは定型のリマインドで済む場合、APIを呼ばずにローカルで結果を組み立てる。
+        予算が設定されている場合、超過しそうなら安いモデル・プロンプトの圧縮で縮退し、
+        それでも収まらない平日チェックはスキップする
+
         Args:
             report_summary: vault_reader.WeeklyReport.get_summary()の返り値
             is_weekend: 週末モード（詳細評価）かどうか
 
         Returns:
-            分析結果のdict
+            分析結果のdict（予算超過でスキップした場合はNone）
+        """
+        if not is_weekend:
+            result = self._analyze_daily_locally(report_summary)
+            if result is not None:
+                return result
+
+        analyzer = self._plan_for_budget(report_summary, is_weekend) if self.ledger.has_budget else self
+        if analyzer is None:
+            return None
+
+        if is_weekend:
+            return analyzer._analyze_detailed(report_summary)
+        else:
+            return analyzer._analyze_daily(report_summary)
+
+    def estimate_cost(self, summary: Dict, is_weekend: bool = False) -> float:
+        """プロンプトのトークン数と見込みの出力トークン数から推定コスト（USD）を計算"""
+        kind, system_prompt, user_prompt = self.build_prompt(summary, is_weekend)
+        prompt_tokens = self.budgeter.estimator.count(system_prompt) + self.budgeter.estimator.count(user_prompt)
+        return estimate_cost(self.model, prompt_tokens, EXPECTED_COMPLETION_TOKENS[kind])
+
+    def _plan_for_budget(self, summary: Dict, is_weekend: bool) -> Optional["WeeklyReportAnalyzer"]:
+        """
+        予算の残額に収まる設定を選ぶ
+
+        通常の設定 → 安いモデル → 安いモデル＋プロンプト予算を半分に、の順に試し、
+        どれも収まらない場合、平日チェックはNone（スキップ）、週末評価は最も安い設定を返す
+        """
+        remaining = self.ledger.remaining()
+        total_budget = self.budgeter.total_budget
+        cheap_model = settings.budget_fallback_model or self.model
+
+        candidates = [(self.model, total_budget)]
+        if cheap_model != self.model:
+            candidates.append((cheap_model, total_budget))
+        candidates.append((cheap_model, total_budget // 2))
+
+        for model, token_budget in candidates:
+            if (model, token_budget) == (self.model, total_budget):
+                analyzer = self
+            else:
+                analyzer = self._with_plan(model, token_budget)
+
+            cost = analyzer.estimate_cost(summary, is_weekend)
+            if cost <= remaining:
+                if analyzer is not self:
+                    logger.warning(
+                        f"予算の残額（${remaining:.4f}）に収めるため縮退します: "
+                        f"モデル {model}, プロンプト予算 {token_budget} tokens（推定 ${cost:.4f}）"
+                    )
+                return analyzer
+
+        if not is_weekend:
+            logger.warning(f"予算の残額（${remaining:.4f}）を超える見込みのため、平日チェックをスキップします")
+            return None
+
+        logger.warning(f"予算の残額（${remaining:.4f}）を超える見込みですが、週末評価は最も安い設定で実行します")
+        return analyzer
+
+    def _with_plan(self, model: str, token_budget: int) -> "WeeklyReportAnalyzer":
+        """モデルとプロンプト予算だけを変えたAnalyzer（クライアント・台帳などは共有）"""
+        return WeeklyReportAnalyzer(
+            snapshot_store=self.snapshot_store,
+            client=self.client,
+            model=model,
+            rate_limiters=self.rate_limiters,
+            ledger=self.ledger,
+            token_budget=token_budget,
+        )
+
+    def build_prompt(self, summary: Dict, is_weekend: bool = False) -> Tuple[str, str, str]:
+        """
+        分析用のプロンプトを組み立てる（差分プロンプトは使わない）
+
+        Returns:
+            (結果種別, システムプロンプト, ユーザープロンプト)
         """
         if is_weekend:
-            return self._analyze_detailed(report_summary)
+            return self._build_detailed_prompt(summary)
         else:
-            return self._analyze_daily(report_summary)
+            return self._build_daily_prompt(summary)
+
+    def _analyze_daily_locally(self, summary: Dict) -> Optional[Dict]:
+        """
+        平日チェックをローカルルールで行う（DAILY_HEURISTICS=offまたは旧テンプレートでは行わない）
+
+        Returns:
+            ローカルで組み立てた結果（気になる兆候がありAPIでチェックする場合はNone）
+        """
+        if settings.daily_heuristics == "off" or not self._is_v2(summary):
+            return None
+
+        started = time.monotonic()
+        verdict = evaluate_daily(summary)
+        latency = time.monotonic() - started
+
+        if not verdict.routine and settings.daily_heuristics != "always":
+            logger.info(f"気になる兆候があるためAPIでチェックします: {'、'.join(verdict.reasons)}")
+            self.ledger.record_heuristic(False, latency)
+            return None
+
+        logger.info("定型のリマインドのため、APIを呼ばずにローカルで作成しました")
+        self.ledger.record_heuristic(True, latency)
+        return verdict.result
 
     def _analyze_daily(self, summary: Dict) -> Dict:
         """平日用の簡易分析（新旧テンプレート対応）"""
+        kind, system_prompt, user_prompt = self._build_daily_prompt(summary)
+
+        # 旧テンプレート（v1）の場合は毎回全体を送る
+        if not self._is_v2(summary):
+            return self._request(kind, system_prompt, user_prompt)
+
+        week_key = SnapshotStore.week_key(summary.get('file_path', ''))
+        snapshot = self.snapshot_store.load(week_key)
+        current = SnapshotStore.compact_summary(summary)
+        delta = compute_delta(snapshot["summary"], current) if snapshot else None
+
+        # 前回から何も変わっていなければ、APIを呼ばずに前回の結果を再利用する
+        if delta is not None and is_empty_delta(delta):
+            previous, missing = validate_partial(kind, snapshot.get("result") or {})
+            if not missing:
+                logger.info(f"前回分析（{snapshot.get('analyzed_at', '不明')}）から変化がないため、前回の結果を再利用します")
+                return previous
+
+        # 同じ週に分析済みなら前回からの差分だけを送る
+        if delta is not None and not delta["focus_changed"]:
+            user_prompt = self._build_delta_prompt(summary, delta, snapshot.get("result", {}))
+            logger.info(f"前回分析（{snapshot.get('analyzed_at', '不明')}）からの差分でチェックします")
+
+        try:
+            validated = self._request_validated(kind, system_prompt, user_prompt)
+        except Exception as e:
+            logger.error(f"OpenAI API エラー（{kind}）: {e}")
+            if settings.daily_heuristics == "off":
+                return self._error_result(kind, str(e))
+            # ネットワーク障害などでAPIが使えない場合も、ローカルで組み立てたリマインドは届ける
+            logger.info("ローカルで作成したリマインドで代替します")
+            return evaluate_daily(summary).result
+
+        # エラー時の値で補完した結果は、再利用・次回の差分プロンプトに使われないようスナップショットに保存しない
+        if all(name in validated for name in self._error_result(kind, "")):
+            self.snapshot_store.save(week_key, summary, validated)
+        else:
+            logger.warning("回答が不完全だったため、今回の分析結果はスナップショットに保存しません")
+        return self.pad_result(kind, validated)
+
+    def _analyze_detailed(self, summary: Dict) -> Dict:
+        """週末用の詳細分析（新旧テンプレート対応）"""
+        kind, system_prompt, user_prompt = self._build_detailed_prompt(summary)
+
+        try:
+            validated = self._request_validated(kind, system_prompt, user_prompt)
+        except Exception as e:
+            logger.error(f"OpenAI API エラー（{kind}）: {e}")
+            return self._error_result(kind, str(e))
+
+        self.save_result(summary.get('file_path', ''), kind, validated)
+        return self.pad_result(kind, validated)
+
+    def save_result(self, file_path: str, kind: str, validated: Dict) -> None:
+        """
+        スコアなどの数値をエクスポートで使えるよう、週ごとに保存しておく
+
+        エラー時の値（スコア0など）を実データとして残さないよう、検証を通らなかったフィールドはNoneで保存する
+        """
+        fields = self._error_result(kind, "")
+        self.snapshot_store.save_result(
+            SnapshotStore.week_key(file_path), kind, {name: validated.get(name) for name in fields}
+        )
+
+    def _build_daily_prompt(self, summary: Dict) -> Tuple[str, str, str]:
+        """平日用のプロンプトを組み立てる（新旧テンプレート対応）"""
         system_prompt = """あなたは個人の週次目標達成をサポートするコーチです。
 週報の進捗状況を確認し、簡潔なリマインドメッセージを提供してください。
 
@@ -44,7 +247,7 @@ class WeeklyReportAnalyzer:
 - mood_comment: 調子に関するコメント（50字以内、ない場合は空文字）"""
 
         # 新テンプレート（v2）の場合
-        if summary.get('focus'):
+        if self._is_v2(summary):
             daily_log = summary.get('daily_log', {})
             avg_mood = daily_log.get('avg_mood', 0)
             entries_count = len(daily_log.get('entries', []))
@@ -60,40 +263,29 @@ class WeeklyReportAnalyzer:
 Try（今週試すこと）: {summary.get('kpt', {}).get('try', '未記入')}
 
 簡潔なリマインドをお願いします。"""
+
         # 旧テンプレート（v1）の場合
         else:
+            sections = self.budgeter.fit({
+                "desired_results": summary.get('desired_results', '未記入'),
+                "accomplishments": summary.get('accomplishments', '未記入'),
+            })
+
             user_prompt = f"""【今週の目標】
-{summary.get('desired_results', '未記入')}
+{sections['desired_results']}
 
 【ToDo進捗】
 完了: {summary['todo_completed']}/{summary['todo_total']}
 
 【やったこと】
-{summary.get('accomplishments', '未記入')}
+{sections['accomplishments']}
 
 簡潔なリマインドをお願いします。"""
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                response_format={"type": "json_object"},
-            )
-            result = json.loads(response.choices[0].message.content)
-            return result
-
-        except Exception as e:
-            logger.error(f"OpenAI API エラー（平日分析）: {e}")
-            return {
-                "message": "分析エラーが発生しました",
-                "mood_comment": ""
-            }
+        return "daily", system_prompt, user_prompt
 
-    def _analyze_detailed(self, summary: Dict) -> Dict:
-        """週末用の詳細分析（新旧テンプレート対応）"""
+    def _build_detailed_prompt(self, summary: Dict) -> Tuple[str, str, str]:
+        """週末用のプロンプトを組み立てる（新旧テンプレート対応）"""
         system_prompt = """あなたは個人の週次振り返りをサポートする専門家です。
 週報の内容を多角的に分析し、建設的なフィードバックを提供してください。
 
@@ -106,7 +298,8 @@ Try（今週試すこと）: {summary.get('kpt', {}).get('try', '未記入')}
 - next_week_suggestions: 来週の目標サジェスト（配列、3項目、各50字以内）"""
 
         # 新テンプレート（v2）の場合
-        if summary.get('focus'):
+        if self._is_v2(summary):
+            kind = "weekend_v2"
             daily_log = summary.get('daily_log', {})
             kpt = summary.get('kpt', {})
 
@@ -114,72 +307,277 @@ Try（今週試すこと）: {summary.get('kpt', {}).get('try', '未記入')}
             daily_entries = daily_log.get('entries', [])
             daily_summary = "\n".join([f"{day}: {content} ({mood}/5)" for day, content, mood in daily_entries])
 
+            # セクションごとのトークン予算に収まるよう圧縮
+            sections = self.budgeter.fit({
+                "focus": summary.get('focus', '未記入'),
+                "daily_log": daily_summary if daily_summary else '未記入',
+                "reflection": summary.get('reflection', '未記入'),
+                "kpt_keep": kpt.get('keep', '未記入'),
+                "kpt_problem": kpt.get('problem', '未記入'),
+                "kpt_try": kpt.get('try', '未記入'),
+                "annual_goals": summary.get('annual_goals', '未記入'),
+            })
+
             user_prompt = f"""【今週のフォーカス】
-{summary.get('focus', '未記入')}
+{sections['focus']}
 
 【デイリーログ】
-{daily_summary if daily_summary else '未記入'}
+{sections['daily_log']}
 平均気分スコア: {daily_log.get('avg_mood', 0):.1f}/5
 
 【振り返り（4つの質問）】
-{summary.get('reflection', '未記入')}
+{sections['reflection']}
 
 【KPT】
-Keep: {kpt.get('keep', '未記入')}
-Problem: {kpt.get('problem', '未記入')}
-Try: {kpt.get('try', '未記入')}
+Keep: {sections['kpt_keep']}
+Problem: {sections['kpt_problem']}
+Try: {sections['kpt_try']}
 
 【年度目標】
-{summary.get('annual_goals', '未記入')}
+{sections['annual_goals']}
 
 上記の週報を分析し、JSON形式で出力してください。"""
 
         # 旧テンプレート（v1）の場合（後方互換性）
         else:
+            kind = "weekend_v1"
+            system_prompt = """あなたは個人の週次振り返りをサポートする専門家です。
+週報の内容を多角的に分析し、建設的なフィードバックを提供してください。
+
+回答はJSON形式で以下を含めてください：
+- goal_achievement_score: 目標達成度 (0-100の整数)
+- task_completion_rate: タスク完了率 (0-100の整数)
+- good_bad_analysis: Good/Badパターン分析（150字程度）
+- annual_goal_alignment: 年度目標との整合性（100字程度）
+- overall_summary: 総合評価コメント（200字程度）
+- next_week_suggestions: 来週の目標サジェスト（配列、3項目、各50字以内）"""
+
+            # セクションごとのトークン予算に収まるよう圧縮
+            sections = self.budgeter.fit({
+                "desired_results": summary.get('desired_results', '未記入'),
+                "todo_list": chr(10).join(summary.get('todo_list', [])),
+                "accomplishments": summary.get('accomplishments', '未記入'),
+                "good_bad": summary.get('good_bad', '未記入'),
+                "analysis": summary.get('analysis', '未記入'),
+                "annual_goals": summary.get('annual_goals', '未記入'),
+            })
+
             user_prompt = f"""【今週の目標】
-{summary.get('desired_results', '未記入')}
+{sections['desired_results']}
 
 【ToDo状況】
 完了: {summary['todo_completed']}/{summary['todo_total']}
-{chr(10).join(summary.get('todo_list', []))}
+{sections['todo_list']}
 
 【やったこと】
-{summary.get('accomplishments', '未記入')}
+{sections['accomplishments']}
 
 【Good/Bad】
-{summary.get('good_bad', '未記入')}
+{sections['good_bad']}
 
 【要因分析】
-{summary.get('analysis', '未記入')}
+{sections['analysis']}
 
 【年度目標】
-{summary.get('annual_goals', '未記入')}
+{sections['annual_goals']}
 
 上記の週報を分析し、JSON形式で出力してください。"""
 
+        return kind, system_prompt, user_prompt
+
+    @staticmethod
+    def _is_v2(summary: Dict) -> bool:
+        """新テンプレート（v2）の週報かどうか（判定済みのバージョンがなければフォーカスの有無で判断）"""
+        template_version = summary.get('template_version')
+        if template_version:
+            return template_version != "v1"
+        return bool(summary.get('focus'))
+
+    @staticmethod
+    def _build_delta_prompt(summary: Dict, delta: Dict, previous_result: Dict) -> str:
+        """前回分析からの差分と、コンパクトな週の状況だけでプロンプトを組み立てる"""
+        daily_log = summary.get('daily_log', {})
+        entries_count = len(daily_log.get('entries', []))
+        avg_mood = daily_log.get('avg_mood', 0)
+
+        changes = []
+        for day, content, mood in delta["new_entries"]:
+            changes.append(f"- デイリーログ追加 {day}: {content} ({mood}/5)")
+        for day, content, mood in delta["changed_entries"]:
+            changes.append(f"- デイリーログ更新 {day}: {content} ({mood}/5)")
+        for key, (_, value) in delta["kpt_changes"].items():
+            changes.append(f"- KPT {key.capitalize()} 更新: {value or '（空欄）'}")
+        if delta["mood_change"]:
+            prev_mood, mood = delta["mood_change"]
+            changes.append(f"- 平均気分スコア: {prev_mood:.1f} → {mood:.1f}")
+
+        return f"""【今週の状況】
+フォーカス: {summary.get('focus', '未記入')}
+記録日数: {entries_count}/7日 / 平均気分スコア: {avg_mood:.1f}/5
+Try（今週試すこと）: {summary.get('kpt', {}).get('try', '未記入')}
+
+【前回のリマインド】
+{previous_result.get('message', 'なし')}
+
+【前回からの変化】
+{chr(10).join(changes) if changes else '変化なし'}
+
+前回からの変化を踏まえて、簡潔なリマインドをお願いします。"""
+
+    def _request(self, kind: str, system_prompt: str, user_prompt: str) -> Dict:
+        """
+        OpenAI APIを呼び出し、回答をスキーマで検証する
+
+        欠落・不正なフィールドがあれば、そのフィールドだけを短いフォローアップで再要求する
+        """
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt},
-                ],
-                response_format={"type": "json_object"},
-            )
-            result = json.loads(response.choices[0].message.content)
-            return result
+            return self.pad_result(kind, self._request_validated(kind, system_prompt, user_prompt))
+        except Exception as e:
+            logger.error(f"OpenAI API エラー（{kind}）: {e}")
+            return self._error_result(kind, str(e))
+
+    def _request_validated(self, kind: str, system_prompt: str, user_prompt: str) -> Dict:
+        """_requestの本体（検証を通ったフィールドのみを返し、APIエラーは呼び出し元に送出する）"""
+        messages = [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt},
+        ]
+
+        return self.validate_response(kind, messages, self._complete(kind, messages))
+
+    def validate_response(self, kind: str, messages: List[Dict], content: str,
+                          follow_up: bool = True) -> Dict:
+        """
+        回答をスキーマで検証する
+
+        Args:
+            kind: 結果種別
+            messages: 回答を得たときのメッセージ
+            content: 回答本文
+            follow_up: 欠落・不正なフィールドを再要求するかどうか
+
+        Returns:
+            検証を通ったフィールドのみのdict
+        """
+        result, missing = validate_partial(kind, self._load_json(content))
+
+        if missing and follow_up:
+            logger.warning(f"回答に欠落・不正なフィールドがあるため再要求します: {missing}")
+            result.update(self._request_missing(kind, messages, content, missing))
+
+        return result
+
+    def pad_result(self, kind: str, result: Dict) -> Dict:
+        """取得できなかったフィールドをエラー時の値で補完する"""
+        fallback = self._error_result(kind, "回答が不完全でした")
+        for name in fallback:
+            if name not in result:
+                logger.warning(f"フィールド '{name}' を取得できませんでした")
 
+        return {name: result.get(name, fallback[name]) for name in fallback}
+
+    def _request_missing(self, kind: str, messages: List[Dict], previous: str, missing: List[str]) -> Dict:
+        """
+        欠落・不正なフィールドのみを再要求する
+
+        元の会話に続けて依頼するため、週報本文を再送してもプロンプトキャッシュが効き、
+        出力も不足分のフィールドだけになる
+        """
+        follow_up = f"""次のフィールドが欠落しているか形式が不正でした。
+これらのフィールドのみをJSON形式で出力してください：
+{describe_fields(kind, missing)}"""
+
+        try:
+            content = self._complete(kind, messages + [
+                {"role": "assistant", "content": previous},
+                {"role": "user", "content": follow_up},
+            ])
+            raw = self._load_json(content)
         except Exception as e:
-            logger.error(f"OpenAI API エラー（週末分析）: {e}")
+            logger.error(f"OpenAI API エラー（{kind} 再要求）: {e}")
+            return {}
+
+        result, _ = validate_partial(kind, {name: raw[name] for name in missing if name in raw})
+        return {name: value for name, value in result.items() if name in missing}
+
+    def _complete(self, kind: str, messages: List[Dict]) -> str:
+        """Chat Completions APIを呼び出して本文を返す（利用量は台帳に記録）"""
+        for limiter in self.rate_limiters:
+            limiter.acquire()
+
+        started = time.monotonic()
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            response_format={"type": "json_object"},
+        )
+        self.record_usage(kind, getattr(response, "usage", None), time.monotonic() - started)
+
+        return response.choices[0].message.content
+
+    def record_usage(self, kind: str, usage, latency: float = 0, batch: bool = False) -> None:
+        """
+        APIの回答に含まれる利用量を台帳に記録
+
+        Args:
+            usage: response.usage（Batch APIの場合は出力ファイルのusageのdict）
+        """
+        if usage is None:
+            return
+
+        if isinstance(usage, dict):
+            prompt_tokens = usage.get("prompt_tokens", 0)
+            completion_tokens = usage.get("completion_tokens", 0)
+            cached_tokens = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        else:
+            prompt_tokens = usage.prompt_tokens or 0
+            completion_tokens = usage.completion_tokens or 0
+            details = getattr(usage, "prompt_tokens_details", None)
+            cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+        cost = self.ledger.record(self.model, kind, prompt_tokens, completion_tokens, cached_tokens, latency, batch)
+        logger.debug(
+            f"API利用量（{kind}）: 入力 {prompt_tokens} (キャッシュ {cached_tokens}) / 出力 {completion_tokens} tokens, "
+            f"推定 ${cost:.4f}"
+        )
+
+    @staticmethod
+    def _load_json(content: str) -> Dict:
+        """JSONをパース（壊れている場合は空dictとして扱い、全フィールドを再要求させる）"""
+        try:
+            return json.loads(content)
+        except (TypeError, ValueError):
+            logger.warning("回答がJSONとして解釈できませんでした")
+            return {}
+
+    @staticmethod
+    def _error_result(kind: str, error: str) -> Dict:
+        """エラー時の分析結果"""
+        if kind == "daily":
             return {
-                "focus_achievement_score": 0,
-                "mood_trend": "分析エラーが発生しました",
-                "reflection_insights": "分析エラーが発生しました",
-                "kpt_feedback": "分析エラーが発生しました",
-                "overall_summary": f"分析エラー: {str(e)}",
+                "message": "分析エラーが発生しました",
+                "mood_comment": ""
+            }
+
+        if kind == "weekend_v1":
+            return {
+                "goal_achievement_score": 0,
+                "task_completion_rate": 0,
+                "good_bad_analysis": "分析エラーが発生しました",
+                "annual_goal_alignment": "分析エラーが発生しました",
+                "overall_summary": f"分析エラー: {error}",
                 "next_week_suggestions": ["エラーにより生成できませんでした"]
             }
 
+        return {
+            "focus_achievement_score": 0,
+            "mood_trend": "分析エラーが発生しました",
+            "reflection_insights": "分析エラーが発生しました",
+            "kpt_feedback": "分析エラーが発生しました",
+            "overall_summary": f"分析エラー: {error}",
+            "next_week_suggestions": ["エラーにより生成できませんでした"]
+        }
+
     @staticmethod
     def is_weekend() -> bool:
         """今日が週末（金曜・土曜・日曜）かどうかを判定"""
@@ -0,0 +1,329 @@
+"""
+OpenAI Batch APIを使ったまとめてレビューモジュール
+
+急ぎでない大量のレビュー（過去分の再レビューなど）を、バッチファイル経由で安価に実行する
+"""
+import json
+import time
+import uuid
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.analyzer import WeeklyReportAnalyzer
+from src.schemas import stub_result
+from src.usage_ledger import BATCH_DISCOUNT
+from src.vault_reader import WeeklyReport
+
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+
+
+class OpenAIBatchBackend:
+    """OpenAI Batch APIにバッチファイルを投入するバックエンド"""
+
+    # 欠落フィールドの再要求を行うかどうか
+    follow_up = True
+
+    def __init__(self, client):
+        self.client = client
+
+    def submit(self, batch_file: Path) -> str:
+        """バッチファイルをアップロードしてバッチを作成し、バッチIDを返す"""
+        with open(batch_file, "rb") as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h",
+        )
+        return batch.id
+
+    def poll(self, batch_id: str) -> Optional[str]:
+        """
+        バッチの状態を確認
+
+        Returns:
+            完了していれば出力ファイル（JSONL）の内容、未完了ならNone
+        """
+        batch = self.client.batches.retrieve(batch_id)
+
+        if batch.status in ("failed", "expired", "cancelled"):
+            raise RuntimeError(f"バッチが終了しました: {batch_id} ({batch.status})")
+
+        if batch.status != "completed":
+            logger.info(f"バッチ処理中: {batch_id} ({batch.status})")
+            return None
+
+        if not batch.output_file_id:
+            raise RuntimeError(f"バッチの出力ファイルがありません: {batch_id}")
+
+        return self.client.files.content(batch.output_file_id).text
+
+
+class LocalBatchBackend:
+    """
+    ネットワークなしで動作確認するためのファイルベースのバックエンド
+
+    投入したバッチファイルを作業ディレクトリにコピーし、
+    記録済みの回答（custom_id → 回答本文のJSONL）またはスタブ回答から
+    OpenAI Batch APIと同じ形式の出力ファイルを生成する
+    """
+
+    follow_up = False
+
+    def __init__(self, work_dir: str, responses_file: Optional[str] = None):
+        self.work_dir = Path(work_dir)
+        self.responses = {}
+
+        if responses_file:
+            with open(responses_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.responses[record["custom_id"]] = record["content"]
+
+    def submit(self, batch_file: Path) -> str:
+        batch_id = f"local_batch_{uuid.uuid4().hex[:12]}"
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        (self.work_dir / f"{batch_id}.input.jsonl").write_bytes(Path(batch_file).read_bytes())
+        return batch_id
+
+    def poll(self, batch_id: str) -> Optional[str]:
+        input_path = self.work_dir / f"{batch_id}.input.jsonl"
+        output_path = self.work_dir / f"{batch_id}.output.jsonl"
+
+        if not output_path.exists():
+            lines = []
+            with open(input_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        lines.append(json.dumps(self._respond(json.loads(line)), ensure_ascii=False))
+            output_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        return output_path.read_text(encoding="utf-8")
+
+    def _respond(self, request: Dict) -> Dict:
+        """1リクエスト分の出力行を生成"""
+        custom_id = request["custom_id"]
+        kind = custom_id.split(":", 1)[0]
+        content = self.responses.get(custom_id)
+        if content is None:
+            content = json.dumps(stub_result(kind), ensure_ascii=False)
+
+        return {
+            "id": f"batch_req_{custom_id}",
+            "custom_id": custom_id,
+            "response": {
+                "status_code": 200,
+                "body": {
+                    "model": request["body"]["model"],
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                },
+            },
+            "error": None,
+        }
+
+
+class BatchReviewRunner:
+    """週報のプロンプトをバッチファイルにまとめ、投入・ポーリング・結果の対応付けを行うクラス"""
+
+    def __init__(self, analyzer: WeeklyReportAnalyzer, backend, work_dir: str):
+        self.analyzer = analyzer
+        self.backend = backend
+        self.work_dir = Path(work_dir)
+
+    def prepare(self, reports: List[WeeklyReport], is_weekend: bool = True) -> Path:
+        """
+        週報ごとのプロンプトをバッチファイル（JSONL）に書き出す
+
+        custom_idと週報ファイルの対応はマニフェストファイルに保存する
+
+        Returns:
+            バッチファイルのパス
+        """
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        name = datetime.now().strftime("batch_%Y%m%d_%H%M%S")
+        batch_file = self.work_dir / f"{name}.jsonl"
+
+        manifest = {"is_weekend": is_weekend, "requests": {}}
+        remaining = self.analyzer.ledger.remaining()
+        estimated = 0.0
+
+        with open(batch_file, "w", encoding="utf-8") as f:
+            for index, report in enumerate(reports):
+                summary = report.get_summary()
+
+                # 予算の残額を超える分は投入しない（Batch APIの割引料金で見積もる）
+                if remaining is not None:
+                    estimated += self.analyzer.estimate_cost(summary, is_weekend) * BATCH_DISCOUNT
+                    if estimated > remaining:
+                        logger.warning(
+                            f"予算の残額（${remaining:.4f}）を超えるため、残り{len(reports) - index}件は投入しません"
+                        )
+                        break
+
+                kind, system_prompt, user_prompt = self.analyzer.build_prompt(summary, is_weekend)
+                messages = [
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ]
+                custom_id = f"{kind}:{index:05d}"
+
+                f.write(json.dumps({
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": BATCH_ENDPOINT,
+                    "body": {
+                        "model": self.analyzer.model,
+                        "messages": messages,
+                        "response_format": {"type": "json_object"},
+                    },
+                }, ensure_ascii=False) + "\n")
+
+                manifest["requests"][custom_id] = {
+                    "file_path": report.file_path,
+                    "kind": kind,
+                    "messages": messages,
+                }
+
+        with open(self._manifest_path(batch_file), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        logger.info(f"バッチファイルを作成しました: {batch_file} ({len(manifest['requests'])}件)")
+        return batch_file
+
+    def submit(self, batch_file: Path) -> str:
+        """バッチを投入し、バッチIDをマニフェストに記録する"""
+        batch_id = self.backend.submit(batch_file)
+
+        with open(self._manifest_path(batch_file), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        manifest["batch_id"] = batch_id
+        self._write_manifest(batch_file, manifest)
+
+        logger.info(f"バッチを投入しました: {batch_id}")
+        return batch_id
+
+    def wait(self, batch_id: str, poll_interval: float = 60, timeout: float = 24 * 60 * 60) -> str:
+        """バッチの完了を待ち、出力ファイルの内容を返す"""
+        deadline = time.monotonic() + timeout
+
+        while True:
+            output = self.backend.poll(batch_id)
+            if output is not None:
+                return output
+
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"バッチが時間内に完了しませんでした: {batch_id}")
+            time.sleep(poll_interval)
+
+    def collect(self, batch_file: Path, output: str) -> Dict[str, Dict]:
+        """
+        出力ファイルの各行を週報ファイルに対応付けて分析結果に変換する
+
+        取得済みであることをマニフェストに記録する（resumeの対象から外す）
+
+        Returns:
+            {週報ファイルのパス: 分析結果}
+        """
+        with open(self._manifest_path(batch_file), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        results = {}
+
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+
+            record = json.loads(line)
+            request = manifest["requests"].get(record.get("custom_id"))
+            if request is None:
+                logger.warning(f"マニフェストにないcustom_idです: {record.get('custom_id')}")
+                continue
+
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                logger.error(f"バッチのリクエストが失敗しました: {request['file_path']} ({record.get('error')})")
+                continue
+
+            self.analyzer.record_usage(request["kind"], response["body"].get("usage"), batch=True)
+            content = response["body"]["choices"][0]["message"]["content"]
+            validated = self.analyzer.validate_response(
+                request["kind"],
+                request["messages"],
+                content,
+                follow_up=self.backend.follow_up,
+            )
+            results[request["file_path"]] = self.analyzer.pad_result(request["kind"], validated)
+            self.analyzer.save_result(request["file_path"], request["kind"], validated)
+
+        missing = len(manifest["requests"]) - len(results)
+        if missing:
+            logger.warning(f"{missing}件の週報の結果を取得できませんでした")
+
+        manifest["collected_at"] = datetime.now().isoformat(timespec="seconds")
+        self._write_manifest(batch_file, manifest)
+        return results
+
+    def pending(self) -> List[Path]:
+        """投入済みで結果をまだ取得していないバッチファイルの一覧（古い順）"""
+        batch_files = []
+        for manifest_path in sorted(self.work_dir.glob("*.manifest.json")):
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            if manifest.get("batch_id") and not manifest.get("collected_at"):
+                batch_files.append(manifest_path.with_name(manifest_path.name.replace(".manifest.json", ".jsonl")))
+        return batch_files
+
+    def resume(self, batch_file: Path, poll_interval: float = 60,
+               wait: bool = True) -> Optional[Tuple[bool, Dict[str, Dict]]]:
+        """
+        マニフェストに記録したバッチIDから、投入済みのバッチの結果を取得する（プロセスの再起動後など）
+
+        Args:
+            batch_file: バッチファイルのパス
+            poll_interval: ポーリング間隔（秒）
+            wait: 完了を待つかどうか（Falseなら1回だけ確認する）
+
+        Returns:
+            (週末モードかどうか, {週報ファイルのパス: 分析結果})、未完了ならNone
+        """
+        with open(self._manifest_path(batch_file), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+
+        batch_id = manifest.get("batch_id")
+        if not batch_id:
+            raise ValueError(f"バッチが投入されていません: {batch_file}")
+
+        if wait:
+            output = self.wait(batch_id, poll_interval)
+        else:
+            output = self.backend.poll(batch_id)
+            if output is None:
+                return None
+
+        return manifest["is_weekend"], self.collect(batch_file, output)
+
+    def run(self, reports: List[WeeklyReport], is_weekend: bool = True,
+            poll_interval: float = 60) -> Dict[str, Dict]:
+        """バッチファイルの作成から結果の取得までをまとめて実行"""
+        batch_file = self.prepare(reports, is_weekend)
+        if batch_file.stat().st_size == 0:
+            logger.warning("投入するリクエストがないためバッチを投入しません")
+            return {}
+
+        batch_id = self.submit(batch_file)
+        output = self.wait(batch_id, poll_interval)
+        return self.collect(batch_file, output)
+
+    @staticmethod
+    def _manifest_path(batch_file: Path) -> Path:
+        return Path(batch_file).with_suffix(".manifest.json")
+
+    def _write_manifest(self, batch_file: Path, manifest: Dict) -> None:
+        with open(self._manifest_path(batch_file), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,156 @@
+"""
+平日チェックのローカルルールモジュール
+
+平日チェックの多くは「今日の記録をつけましょう」「調子は○○です」程度の定型のリマインドで済むため、
+パース済みのサマリ（新テンプレート）からリマインドと調子のコメントを直接組み立てる。
+調子の急落など気になる兆候がある場合だけ、LLMでのチェックに回す。
+"""
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.vault_reader import DAYS_OF_WEEK
+
+# これ以下の調子が直近の記録にあればLLMに回す
+LOW_MOOD = 2
+
+# 前日からこれ以上下がったらLLMに回す
+MOOD_DROP = 2
+
+# 2日以上の記録の平均がこれ以下ならLLMに回す
+LOW_AVG_MOOD = 2.5
+
+# リマインド・調子のコメントの最大文字数（プロンプトで指示している文字数に合わせる）
+MESSAGE_MAX_CHARS = 150
+MOOD_COMMENT_MAX_CHARS = 50
+
+# メッセージに引用するフォーカス・Tryの最大文字数
+QUOTE_MAX_CHARS = 30
+
+
+@dataclass
+class DailyVerdict:
+    """ローカルルールによる判定結果"""
+    result: Dict
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def routine(self) -> bool:
+        """定型のリマインドで済む（LLMに回す理由がない）かどうか"""
+        return not self.reasons
+
+
+def days_into_week(file_path: str, today: Optional[date] = None) -> int:
+    """週報ファイル名（2026-W42.md）の週の月曜から今日までの日数（解釈できなければ今日の曜日）"""
+    today = today or date.today()
+    try:
+        monday = datetime.strptime(f"{Path(file_path).stem}-1", "%G-W%V-%u").date()
+    except ValueError:
+        return today.weekday()
+    return (today - monday).days
+
+
+def expected_days(offset: int) -> str:
+    """今日までに記録があるはずの曜日（今週なら月曜から今日まで、過去の週なら全曜日）"""
+    if offset < 0:
+        return ""
+    return DAYS_OF_WEEK[:min(offset, 6) + 1]
+
+
+def _quote(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= QUOTE_MAX_CHARS else text[:QUOTE_MAX_CHARS - 1] + "…"
+
+
+def _build_message(summary: Dict, offset: int, recorded: set) -> str:
+    parts = []
+    focus = summary.get("focus", "").strip()
+    kpt_try = summary.get("kpt", {}).get("try", "").strip()
+
+    if not focus:
+        parts.append("今週のフォーカスが未記入です。まず1つだけ決めましょう。")
+
+    days = expected_days(offset)
+    missing = [day for day in days if day not in recorded]
+    if offset <= 6:
+        if days and days[-1] in missing:
+            parts.append(f"今日（{days[-1]}）のデイリーログがまだです。一言でも記録しましょう。")
+            missing = missing[:-1]
+        if missing:
+            parts.append(f"{'・'.join(missing)}の記録も抜けています。")
+        elif days and days[-1] in recorded:
+            parts.append("今日まで毎日記録できています。")
+    elif missing:
+        parts.append(f"{'・'.join(missing)}のデイリーログが抜けています。")
+
+    if not kpt_try:
+        parts.append("KPTのTryが未記入です。今週試すことを1つ書きましょう。")
+    elif focus:
+        parts.append(f"Try「{_quote(kpt_try)}」を意識しつつ、フォーカス「{_quote(focus)}」に集中しましょう。")
+    else:
+        parts.append(f"Try「{_quote(kpt_try)}」を意識して進めましょう。")
+
+    # 文の途中で切れないよう、上限に収まる文までにする
+    message = ""
+    for part in parts:
+        if len(message) + len(part) > MESSAGE_MAX_CHARS:
+            break
+        message += part
+    return message or parts[0][:MESSAGE_MAX_CHARS]
+
+
+def _build_mood_comment(moods: List[int], avg_mood: float) -> str:
+    if not moods:
+        return ""
+    if len(moods) == 1:
+        return f"調子は{moods[0]}/5です。"
+
+    first, last = moods[0], moods[-1]
+    if last > first:
+        comment = f"調子は上向きです（{first}→{last}/5）。この流れを保ちましょう。"
+    elif last < first:
+        comment = f"調子はやや下がり気味です（{first}→{last}/5）。無理せずいきましょう。"
+    else:
+        comment = f"調子は安定しています（平均{avg_mood:.1f}/5）。"
+    return comment[:MOOD_COMMENT_MAX_CHARS]
+
+
+def _noteworthy(moods: List[int], avg_mood: float) -> List[str]:
+    """LLMに回す理由（気になる兆候）"""
+    reasons = []
+    if moods and moods[-1] <= LOW_MOOD:
+        reasons.append(f"直近の調子が低い（{moods[-1]}/5）")
+    if len(moods) >= 2 and moods[-2] - moods[-1] >= MOOD_DROP:
+        reasons.append(f"調子が急に下がった（{moods[-2]}→{moods[-1]}/5）")
+    if len(moods) >= 2 and avg_mood <= LOW_AVG_MOOD:
+        reasons.append(f"平均の調子が低い（{avg_mood:.1f}/5）")
+    return reasons
+
+
+def evaluate_daily(summary: Dict, today: Optional[date] = None) -> DailyVerdict:
+    """
+    新テンプレート（v2）のサマリから平日チェックの結果を組み立てる
+
+    Args:
+        summary: vault_reader.WeeklyReport.get_summary()の返り値
+        today: 判定の基準日（省略時は今日）
+
+    Returns:
+        DailyVerdict（resultはAPIの回答と同じ {"message", "mood_comment"} の形）
+    """
+    daily_log = summary.get("daily_log", {})
+    entries = sorted(daily_log.get("entries", []), key=lambda entry: DAYS_OF_WEEK.find(entry[0]))
+    moods = [mood for _, _, mood in entries]
+    avg_mood = daily_log.get("avg_mood", 0)
+
+    offset = days_into_week(summary.get("file_path", ""), today)
+    recorded = {day for day, _, _ in entries}
+
+    return DailyVerdict(
+        result={
+            "message": _build_message(summary, offset, recorded),
+            "mood_comment": _build_mood_comment(moods, avg_mood),
+        },
+        reasons=_noteworthy(moods, avg_mood),
+    )
@@ -0,0 +1,347 @@
+"""
+Vault全体の週報を列指向データセットにエクスポートするモジュール
+
+気分・ToDo完了率・AIの評価スコアを年をまたいで集計できるよう、
+全週の週報を並列にパースして Parquet（pyarrowがなければCSV）に書き出す。
+前回のエクスポートから変更された週だけを読み直す。
+"""
+import csv
+import json
+import logging
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src import log_config
+from src.snapshot_store import SnapshotStore
+from src.vault_reader import DAYS_OF_WEEK, VaultReader
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # オプション依存（未インストールならCSVで出力）
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+# 週ごとのテーブルの列（列名, 型）
+WEEK_COLUMNS = [
+    ("week", "string"),
+    ("iso_year", "int"),
+    ("iso_week", "int"),
+    ("week_start", "string"),
+    ("template_version", "string"),
+    ("degraded", "bool"),
+    ("focus", "string"),
+    ("days_logged", "int"),
+    ("avg_mood", "float"),
+    ("todo_completed", "int"),
+    ("todo_total", "int"),
+    ("todo_completion_rate", "float"),
+    ("kpt_keep", "string"),
+    ("kpt_problem", "string"),
+    ("kpt_try", "string"),
+    ("focus_achievement_score", "int"),
+    ("goal_achievement_score", "int"),
+    ("task_completion_rate", "int"),
+    ("score_source", "string"),
+    ("analyzed_at", "string"),
+]
+
+# デイリーログのテーブルの列（1行 = 1日）
+DAILY_COLUMNS = [
+    ("week", "string"),
+    ("iso_year", "int"),
+    ("iso_week", "int"),
+    ("date", "string"),
+    ("day", "string"),
+    ("content", "string"),
+    ("mood", "int"),
+]
+
+# AIの数値出力と、保存済みの結果がない場合にAIサマリから読み取るための正規表現
+# （writer.MarkdownWriter._format_summary の出力形式に対応）
+SCORE_PATTERNS = {
+    "focus_achievement_score": re.compile(r"\*\*フォーカス達成度\*\*:\s*(\d+)/100点"),
+    "goal_achievement_score": re.compile(r"\*\*目標達成度\*\*:\s*(\d+)/100点"),
+    "task_completion_rate": re.compile(r"\*\*タスク完了率\*\*:\s*(\d+)%"),
+}
+
+WEEK_FILE_RE = re.compile(r"^(\d{4})-W(\d{2})$")
+
+# エクスポートに使うサマリの項目（これ以外はパースしない）
+SUMMARY_FIELDS = ("focus", "daily_log", "kpt", "todo_completed", "todo_total", "ai_summary")
+
+
+def load_week_rows(file_path: str, state_dir: str) -> Tuple[Dict, List[Dict]]:
+    """
+    1週分の週報をパースして行に変換する（ワーカープロセスで実行）
+
+    Returns:
+        (週のテーブルの1行, デイリーログのテーブルの行のリスト)
+    """
+    week = Path(file_path).stem
+    match = WEEK_FILE_RE.match(week)
+    iso_year, iso_week = int(match.group(1)), int(match.group(2))
+    try:
+        monday = date.fromisocalendar(iso_year, iso_week, 1)
+    except ValueError:
+        monday = None
+
+    report = VaultReader(str(Path(file_path).parent)).read_weekly_report(file_path, SUMMARY_FIELDS)
+    if report is None:
+        raise ValueError(f"週報を読み込めませんでした: {file_path}")
+
+    summary = report.get_summary(SUMMARY_FIELDS)
+    daily_log = summary["daily_log"]
+    entries = daily_log["entries"]
+    kpt = summary["kpt"]
+    todo_total = summary["todo_total"]
+
+    row = {
+        "week": week,
+        "iso_year": iso_year,
+        "iso_week": iso_week,
+        "week_start": monday.isoformat() if monday else None,
+        "template_version": report.template_version,
+        "degraded": report.degraded,
+        "focus": summary["focus"],
+        "days_logged": len(entries),
+        "avg_mood": daily_log["avg_mood"] if entries else None,
+        "todo_completed": summary["todo_completed"],
+        "todo_total": todo_total,
+        "todo_completion_rate": summary["todo_completed"] / todo_total if todo_total else None,
+        "kpt_keep": kpt["keep"],
+        "kpt_problem": kpt["problem"],
+        "kpt_try": kpt["try"],
+    }
+    row.update(_scores(week, summary["ai_summary"], state_dir))
+
+    daily_rows = []
+    for day, content, mood in entries:
+        day_date = None
+        if monday is not None:
+            day_date = date.fromordinal(monday.toordinal() + DAYS_OF_WEEK.index(day)).isoformat()
+        daily_rows.append({
+            "week": week,
+            "iso_year": iso_year,
+            "iso_week": iso_week,
+            "date": day_date,
+            "day": day,
+            "content": content,
+            "mood": mood,
+        })
+
+    return row, daily_rows
+
+
+def _scores(week: str, ai_summary: str, state_dir: str) -> Dict:
+    """
+    週末評価の数値を取得する
+
+    保存済みの分析結果を優先し、なければAIサマリの本文から読み取る
+    """
+    scores = {name: None for name in SCORE_PATTERNS}
+    saved = SnapshotStore(state_dir).load_results(week)
+    weekend = [saved[kind] for kind in ("weekend_v2", "weekend_v1") if kind in saved]
+
+    if weekend:
+        latest = max(weekend, key=lambda item: item.get("analyzed_at", ""))
+        for name in scores:
+            scores[name] = latest["result"].get(name)
+        scores.update(score_source="state", analyzed_at=latest.get("analyzed_at"))
+        return scores
+
+    for name, pattern in SCORE_PATTERNS.items():
+        match = pattern.search(ai_summary)
+        if match:
+            scores[name] = int(match.group(1))
+
+    found = any(value is not None for value in scores.values())
+    scores.update(score_source="ai_summary" if found else None, analyzed_at=None)
+    return scores
+
+
+class VaultExporter:
+    """Vault全体の週報を列指向データセットに書き出すクラス"""
+
+    def __init__(self, vault_path: str, output_dir: str, state_dir: str, workers: int = 2,
+                 output_format: str = "auto"):
+        self.reader = VaultReader(vault_path)
+        self.output_dir = Path(output_dir)
+        self.state_dir = state_dir
+        self.workers = workers
+
+        if output_format == "auto":
+            output_format = "parquet" if pyarrow is not None else "csv"
+        if output_format == "parquet" and pyarrow is None:
+            raise ValueError("Parquetで出力するには pyarrow をインストールしてください（pip install pyarrow）")
+        self.output_format = output_format
+
+    @property
+    def manifest_path(self) -> Path:
+        return self.output_dir / "manifest.json"
+
+    def export(self, full: bool = False) -> Dict:
+        """
+        エクスポートを実行
+
+        Args:
+            full: 前回の結果を使わずに全週を読み直すかどうか
+
+        Returns:
+            {"weeks": 週数, "reparsed": 読み直した週数, "removed": 削除された週数, "files": [出力ファイル]}
+        """
+        manifest = {} if full else self._load_manifest()
+        entries = {}
+        changed = []
+        listed = set()
+
+        for file_path in self.reader.list_weekly_files():
+            week = Path(file_path).stem
+            listed.add(week)
+            fingerprint = self._fingerprint(file_path, week)
+            cached = manifest.get(week)
+
+            if cached is not None and cached["fingerprint"] == fingerprint:
+                entries[week] = cached
+            else:
+                changed.append((week, file_path, fingerprint))
+
+        for week, file_path, fingerprint, rows in self._parse_all(changed):
+            row, daily_rows = rows
+            entries[week] = {
+                "file_path": file_path,
+                "fingerprint": fingerprint,
+                "row": row,
+                "daily_rows": daily_rows,
+            }
+
+        # 読み直せなかった週は前回の結果を残す（指紋も前回のままにして、次回また読み直す）
+        for week, file_path, _ in changed:
+            if week not in entries and week in manifest:
+                logger.warning(f"週報を読み直せなかったため、前回のエクスポート結果を使います: {file_path}")
+                entries[week] = manifest[week]
+
+        removed = sorted(set(manifest) - listed)
+        if removed:
+            logger.info(f"Vaultから削除された週を除外します: {removed}")
+
+        weeks = sorted(entries)
+        week_rows = [entries[week]["row"] for week in weeks]
+        daily_rows = [row for week in weeks for row in entries[week]["daily_rows"]]
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        files = [
+            self._write_table("weeks", WEEK_COLUMNS, week_rows),
+            self._write_table("daily_log", DAILY_COLUMNS, daily_rows),
+        ]
+        self._save_manifest(entries)
+
+        logger.info(
+            f"{len(weeks)}週分をエクスポートしました（読み直し {len(changed)}週, 形式 {self.output_format}）: "
+            f"{self.output_dir}"
+        )
+        return {
+            "weeks": len(weeks),
+            "reparsed": len(changed),
+            "removed": len(removed),
+            "files": [str(path) for path in files],
+        }
+
+    def _parse_all(self, changed: List[Tuple[str, str, Dict]]):
+        """変更された週を並列にパースする（読み込めなかった週は除外）"""
+        if not changed:
+            return
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=log_config.init_child_logging,
+            initargs=(log_config.child_config(),),
+        ) as pool:
+            futures = [
+                (week, file_path, fingerprint, pool.submit(load_week_rows, file_path, self.state_dir))
+                for week, file_path, fingerprint in changed
+            ]
+
+            for week, file_path, fingerprint, future in futures:
+                try:
+                    yield week, file_path, fingerprint, future.result()
+                except Exception as e:
+                    logger.error(f"週報のエクスポートに失敗しました: {file_path} ({e})")
+
+    def _fingerprint(self, file_path: str, week: str) -> Dict:
+        """週報と保存済みの分析結果の更新時刻・サイズ（変更検出用）"""
+        stat = os.stat(file_path)
+        result_path = SnapshotStore(self.state_dir).result_path(week)
+        result_mtime = result_path.stat().st_mtime_ns if result_path.exists() else None
+
+        return {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "result_mtime_ns": result_mtime,
+        }
+
+    def _load_manifest(self) -> Dict:
+        """前回のエクスポート結果を読み込む（形式が変わった場合は全週を読み直す）"""
+        if not self.manifest_path.exists():
+            return {}
+
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.warning(f"マニフェストの読み込みに失敗したため全週を読み直します: {e}")
+            return {}
+
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("format") != self.output_format:
+            return {}
+        return manifest.get("weeks", {})
+
+    def _save_manifest(self, entries: Dict) -> None:
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "format": self.output_format,
+            "weeks": entries,
+        }
+        SnapshotStore._write_json(self.manifest_path, manifest)
+
+    def _write_table(self, name: str, columns: List[Tuple[str, str]], rows: List[Dict]) -> Path:
+        """テーブルを書き出す（一時ファイルに書いてから置き換える）"""
+        suffix = ".parquet" if self.output_format == "parquet" else ".csv"
+        path = self.output_dir / f"{name}{suffix}"
+        tmp_path = path.with_suffix(suffix + ".tmp")
+
+        if self.output_format == "parquet":
+            self._write_parquet(tmp_path, columns, rows)
+        else:
+            self._write_csv(tmp_path, columns, rows)
+
+        tmp_path.replace(path)
+        return path
+
+    @staticmethod
+    def _write_parquet(path: Path, columns: List[Tuple[str, str]], rows: List[Dict]) -> None:
+        types = {
+            "string": pyarrow.string(),
+            "int": pyarrow.int64(),
+            "float": pyarrow.float64(),
+            "bool": pyarrow.bool_(),
+        }
+        schema = pyarrow.schema([(name, types[kind]) for name, kind in columns])
+        table = pyarrow.Table.from_pylist(rows, schema=schema)
+        pyarrow.parquet.write_table(table, str(path))
+
+    @staticmethod
+    def _write_csv(path: Path, columns: List[Tuple[str, str]], rows: List[Dict]) -> None:
+        # Excelで文字化けしないようBOM付きUTF-8で書き出す
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=[name for name, _ in columns])
+            writer.writeheader()
+            writer.writerows(rows)
+
@@ -0,0 +1,258 @@
+"""
+ロギング設定モジュール
+
+ログの出力はキュー経由で別スレッドに任せ、呼び出し側がファイルI/Oで待たされないようにする。
+ログファイルはサイズ・日付でローテーションし、ローテーション済みのファイルはgzipで圧縮する。
+"""
+import os
+import gzip
+import json
+import queue
+import atexit
+import shutil
+import logging
+import logging.handlers
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# LogRecordの標準属性（JSON形式ではこれ以外の属性をextraとして出力する）
+STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# ワーカープロセスのロギング設定（setup_loggingで設定し、プールのinitializerに渡す）
+_child_config: Optional[Dict] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """1レコードを1行のJSONとして出力するフォーマッタ"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "process": record.process,
+            "thread": record.threadName,
+        }
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exception"] = record.exc_text
+        if record.stack_info:
+            data["stack"] = record.stack_info
+
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS and not key.startswith("_"):
+                data[key] = value
+
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class DeferredFormatQueueHandler(logging.handlers.QueueHandler):
+    """
+    フォーマットをリスナー側に任せるQueueHandler
+
+    標準のQueueHandlerはキューに入れる前にメッセージと例外を文字列化するため、
+    呼び出し側で必要な最小限（引数の埋め込み・例外の文字列化）だけを行う
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+
+        # 例外オブジェクトはスレッドをまたいで保持しない（トレースバックは文字列にしておく）
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+
+        return record
+
+
+class CompressingRotatingFileHandler(logging.handlers.BaseRotatingHandler):
+    """
+    サイズ・日付の両方でローテーションし、ローテーション済みのファイルをgzipで圧縮するハンドラ
+
+    1回ごとに終了するlaunchdの実行でも日付で分かれるよう、
+    日付の判定は既存のログファイルの最終更新日時から行う
+    """
+
+    def __init__(self, filename: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 14,
+                 encoding: str = "utf-8"):
+        Path(filename).parent.mkdir(parents=True, exist_ok=True)
+        super().__init__(filename, "a", encoding=encoding, delay=True)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotator = self._gzip_rotator
+        self.namer = lambda name: name + ".gz"
+
+        started = datetime.fromtimestamp(os.stat(filename).st_mtime) if os.path.exists(filename) else datetime.now()
+        self.rollover_at = self._next_midnight(started)
+
+    @staticmethod
+    def _next_midnight(moment: datetime) -> float:
+        midnight = moment.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        return midnight.timestamp()
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        if record.created >= self.rollover_at:
+            return os.path.exists(self.baseFilename)
+
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            message = f"{self.format(record)}{self.terminator}"
+            if self.stream.tell() + len(message.encode(self.encoding or "utf-8")) >= self.max_bytes:
+                return self.stream.tell() > 0
+
+        return False
+
+    def doRollover(self) -> None:
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+
+        # 元のログの最終更新日時をファイル名にする（同じ秒に複数回ローテーションしても上書きしない）
+        stamp = datetime.fromtimestamp(os.stat(self.baseFilename).st_mtime).strftime("%Y%m%d-%H%M%S")
+        destination = f"{self.baseFilename}.{stamp}"
+        suffix = 1
+        while os.path.exists(self.rotation_filename(destination)):
+            destination = f"{self.baseFilename}.{stamp}-{suffix}"
+            suffix += 1
+
+        self.rotate(self.baseFilename, self.rotation_filename(destination))
+        self._remove_old_backups()
+        self.rollover_at = self._next_midnight(datetime.now())
+
+    def _remove_old_backups(self) -> None:
+        if self.backup_count <= 0:
+            return
+
+        base = Path(self.baseFilename)
+        backups = sorted(base.parent.glob(f"{base.name}.*.gz"), key=lambda path: path.stat().st_mtime)
+        for path in backups[:-self.backup_count]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    @staticmethod
+    def _gzip_rotator(source: str, destination: str) -> None:
+        with open(source, "rb") as src, gzip.open(destination, "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        # 圧縮後のファイルは元のログの更新日時を引き継ぐ（世代の並び順に使う）
+        stat = os.stat(source)
+        os.utime(destination, (stat.st_atime, stat.st_mtime))
+        os.remove(source)
+
+
+def setup_logging(log_file: str, level: str = "INFO", log_format: str = "text",
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 14) -> logging.handlers.QueueListener:
+    """
+    キュー経由のロギングを設定
+
+    Args:
+        log_file: ログファイルのパス
+        level: ログレベル
+        log_format: "text" または "json"（ファイル出力の形式、コンソールは常にテキスト）
+        max_bytes: このサイズを超えたらローテーション（0なら日付のみ）
+        backup_count: 残す圧縮済みファイルの数
+
+    Returns:
+        QueueListener（終了時はshutdown_loggingで停止する）
+    """
+    global _listener, _child_config
+    shutdown_logging()
+    _child_config = {"log_file": log_file, "level": level, "log_format": log_format}
+
+    file_handler = CompressingRotatingFileHandler(log_file, max_bytes=max_bytes, backup_count=backup_count)
+    file_handler.setFormatter(JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT))
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = DeferredFormatQueueHandler(log_queue)
+
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, level))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler, respect_handler_level=True)
+    _listener.start()
+
+    # fork したワーカープロセスにはリスナーのスレッドがないため、直接ファイルに追記する
+    # （spawn で起動するワーカーは init_child_logging をプールの initializer に指定して設定する）
+    child_handlers = _child_handlers(log_file, file_handler.formatter)
+    os.register_at_fork(after_in_child=lambda: _use_direct_handlers(queue_handler, child_handlers))
+
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def child_config() -> Optional[Dict]:
+    """ワーカープロセスに渡すロギング設定（setup_logging前はNone）"""
+    return _child_config
+
+
+def init_child_logging(config: Optional[Dict]) -> None:
+    """
+    ProcessPoolExecutorのinitializer: ワーカープロセスのログを直接ファイルに追記する
+
+    spawnで起動したワーカー（macOSの既定）はロギングが未設定のままのため、親の設定を引き継いで設定し直す
+    （forkの場合もregister_at_forkで差し替えたハンドラを同じ設定で置き換える）。
+    ローテーションは親プロセスのリスナーだけが行う。
+
+    使い方:
+        ProcessPoolExecutor(initializer=init_child_logging, initargs=(child_config(),))
+    """
+    if config is None:
+        return
+
+    formatter = JsonFormatter() if config["log_format"] == "json" else logging.Formatter(TEXT_FORMAT)
+    root = logging.getLogger()
+    root.setLevel(getattr(logging, config["level"]))
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in _child_handlers(config["log_file"], formatter):
+        root.addHandler(handler)
+
+
+def _child_handlers(log_file: str, formatter: logging.Formatter) -> List[logging.Handler]:
+    file_handler = logging.FileHandler(log_file, encoding="utf-8", delay=True)
+    file_handler.setFormatter(formatter)
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    return [file_handler, stream_handler]
+
+
+def _use_direct_handlers(queue_handler: logging.Handler, handlers: List[logging.Handler]) -> None:
+    global _listener
+    _listener = None
+
+    root = logging.getLogger()
+    if queue_handler in root.handlers:
+        root.removeHandler(queue_handler)
+        for handler in handlers:
+            root.addHandler(handler)
+
+
+def shutdown_logging() -> None:
+    """キューに残っているログをすべて書き出してからリスナーを停止する"""
+    global _listener
+    if _listener is None:
+        return
+
+    listener, _listener = _listener, None
+    listener.stop()
+    for handler in listener.handlers:
+        handler.flush()
+        handler.close()
@@ -2,43 +2,53 @@
 週報AIレビューシステム メインモジュール
 """
 import sys
+import signal
 import logging
+import argparse
+from datetime import datetime
 from pathlib import Path
+from typing import Dict, Optional
 
 # プロジェクトルートをパスに追加
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from config.settings import settings
+from config.profiles import load_profiles
+from src import log_config
 from src.vault_reader import VaultReader
 from src.analyzer import WeeklyReportAnalyzer
 from src.writer import MarkdownWriter
 from src.notifier import DesktopNotifier, LINENotifier
+from src.batch import BatchReviewRunner, LocalBatchBackend, OpenAIBatchBackend
+from src.exporter import VaultExporter
+from src.scheduler import MultiProfileScheduler
+from src.run_lock import week_flight
+from src.usage_ledger import UsageLedger, default_db_path
 
 
 def setup_logging():
-    """ロギング設定"""
+    """ロギング設定（キュー経由で書き出し、終了時にすべて書き出してから停止する）"""
     log_dir = project_root / "logs"
     log_dir.mkdir(exist_ok=True)
 
     log_file = log_dir / "weekly_review.log"
 
-    logging.basicConfig(
-        level=getattr(logging, settings.log_level),
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.FileHandler(log_file, encoding="utf-8"),
-            logging.StreamHandler()
-        ]
+    log_config.setup_logging(
+        str(log_file),
+        level=settings.log_level,
+        log_format=settings.log_format,
+        max_bytes=settings.log_max_bytes,
+        backup_count=settings.log_backup_count,
     )
 
 
-def validate_settings():
+def validate_settings(require_api_key: bool = True):
     """設定のバリデーション"""
     if not settings.vault_path:
         raise ValueError("環境変数 VAULT_PATH が設定されていません")
 
-    if not settings.openai_api_key:
+    if require_api_key and not settings.openai_api_key:
         raise ValueError("環境変数 OPENAI_API_KEY が設定されていません")
 
     if not Path(settings.vault_path).exists():
@@ -55,47 +65,28 @@ def main():
         validate_settings()
         logger.info(f"Vaultパス: {settings.vault_path}")
 
-        # 2. 週報を読み込み
         reader = VaultReader(settings.vault_path)
-        report = reader.read_weekly_report()
+        file_path = reader.get_current_week_file()
 
-        if report is None:
+        if file_path is None:
             logger.warning("今週の週報ファイルが見つかりません")
             DesktopNotifier.notify_error("今週の週報ファイルが見つかりません")
             LINENotifier.notify("⚠️ 週報AIレビュー エラー\n\n今週の週報ファイルが見つかりません")
             return
 
-        logger.info(f"週報を読み込みました: {report.file_path}")
-        summary = report.get_summary()
+        is_weekend = WeeklyReportAnalyzer.is_weekend()
+        logger.info(f"分析モード: {'週末詳細評価' if is_weekend else '平日簡易チェック'}")
 
-        # 2-2. 前週の週報を読み込んで引き継ぎを更新（新テンプレートv2のみ）
-        prev_report = reader.read_previous_week_report()
-        if prev_report:
-            prev_summary = prev_report.get_summary()
-            prev_kpt = prev_summary.get('kpt', {})
-            if prev_kpt.get('problem') or prev_kpt.get('try'):
-                MarkdownWriter.update_prev_week_section(report.file_path, prev_kpt)
-                logger.info("前週からの引き継ぎを更新しました")
+        # 2〜4. 同じ週のレビューが実行中なら完了を待ち、API呼び出し・書き込みをせずにその結果を再利用する
+        with week_flight(settings.vault_path, file_path, is_weekend) as flight:
+            if flight.shared_result is not None:
+                logger.info("=== 週報AIレビュー 終了（別の実行の結果を再利用） ===")
+                return
 
-        # 3. AI分析
-        analyzer = WeeklyReportAnalyzer()
-        is_weekend = analyzer.is_weekend()
-
-        logger.info(f"分析モード: {'週末詳細評価' if is_weekend else '平日簡易チェック'}")
-        analysis_result = analyzer.analyze(summary, is_weekend)
-
-        # 4. 週報に書き込み
-        success = MarkdownWriter.update_ai_summary(
-            report.file_path,
-            analysis_result,
-            is_weekend
-        )
-
-        if not success:
-            logger.error("週報の書き込みに失敗しました")
-            DesktopNotifier.notify_error("週報の書き込みに失敗しました")
-            LINENotifier.notify("⚠️ 週報AIレビュー エラー\n\n週報の書き込みに失敗しました")
-            return
+            analysis_result = review_week(reader, file_path, is_weekend)
+            if analysis_result is None:
+                return
+            flight.publish(analysis_result)
 
         # 5. 通知送信
         if is_weekend:
@@ -114,6 +105,266 @@ def main():
         sys.exit(1)
 
 
+def review_week(reader: VaultReader, file_path: str, is_weekend: bool) -> Optional[Dict]:
+    """
+    週報を読み込んで分析し、結果を書き込む（ロックを保持した状態で実行）
+
+    Returns:
+        分析結果（スキップ・失敗した場合はNone）
+    """
+    logger = logging.getLogger(__name__)
+
+    # 2. 週報を読み込み
+    report = reader.read_weekly_report(file_path)
+
+    if report is None:
+        logger.warning("今週の週報ファイルが見つかりません")
+        DesktopNotifier.notify_error("今週の週報ファイルが見つかりません")
+        LINENotifier.notify("⚠️ 週報AIレビュー エラー\n\n今週の週報ファイルが見つかりません")
+        return None
+
+    logger.info(f"週報を読み込みました: {report.file_path}")
+
+    # 空のサマリで分析すると、AIサマリを中身のない結果で上書きしてしまう
+    if report.unreadable:
+        logger.error(f"週報をパースできなかったため、分析・書き込みをスキップしました: {report.file_path}")
+        DesktopNotifier.notify_error("週報をパースできなかったため、レビューをスキップしました")
+        LINENotifier.notify("⚠️ 週報AIレビュー エラー\n\n週報をパースできなかったため、レビューをスキップしました")
+        return None
+
+    summary = report.get_summary()
+
+    # 2-2. 前週の週報を読み込んで引き継ぎを更新（新テンプレートv2のみ）
+    prev_report = reader.read_previous_week_report(fields=("kpt",))
+    if prev_report:
+        prev_summary = prev_report.get_summary(fields=("kpt",))
+        prev_kpt = prev_summary.get('kpt', {})
+        if prev_kpt.get('problem') or prev_kpt.get('try'):
+            MarkdownWriter.update_prev_week_section(report.file_path, prev_kpt, report.template_version)
+            logger.info("前週からの引き継ぎを更新しました")
+
+    # 3. AI分析
+    analyzer = WeeklyReportAnalyzer()
+    analysis_result = analyzer.analyze(summary, is_weekend)
+
+    if analysis_result is None:
+        logger.warning("AIの利用予算の上限に達したため、本日のチェックはスキップしました")
+        return None
+
+    # 4. 週報に書き込み
+    success = MarkdownWriter.update_ai_summary(
+        report.file_path,
+        analysis_result,
+        is_weekend,
+        report.template_version
+    )
+
+    if not success:
+        logger.error("週報の書き込みに失敗しました")
+        DesktopNotifier.notify_error("週報の書き込みに失敗しました")
+        LINENotifier.notify("⚠️ 週報AIレビュー エラー\n\n週報の書き込みに失敗しました")
+        return None
+
+    return analysis_result
+
+
+def run_batch(args: argparse.Namespace):
+    """Batch APIで複数の週報をまとめてレビュー"""
+    logger = logging.getLogger(__name__)
+    logger.info("=== 週報AIレビュー（バッチ） 開始 ===")
+
+    validate_settings(require_api_key=args.local is None)
+
+    reader = VaultReader(settings.vault_path)
+    files = args.files or reader.list_weekly_files()
+    reports = [report for report in map(reader.read_weekly_report, files) if report is not None]
+    for report in [report for report in reports if report.unreadable]:
+        logger.error(f"週報をパースできなかったため、バッチから除外しました: {report.file_path}")
+    reports = [report for report in reports if not report.unreadable]
+
+    if not reports:
+        logger.warning("レビュー対象の週報がありません")
+        return
+
+    is_weekend = not args.daily
+    runner = _batch_runner(args)
+    results = runner.run(reports, is_weekend, poll_interval=args.poll_interval)
+    _write_batch_results(results, is_weekend)
+
+    logger.info("=== 週報AIレビュー（バッチ） 終了 ===")
+
+
+def run_batch_collect(args: argparse.Namespace):
+    """投入済みのバッチの結果を、マニフェストに記録したバッチIDから取得して書き込む（再起動後の再開用）"""
+    logger = logging.getLogger(__name__)
+    logger.info("=== 週報AIレビュー（バッチ結果の取得） 開始 ===")
+
+    validate_settings(require_api_key=args.local is None)
+
+    runner = _batch_runner(args)
+    batch_files = [Path(path) for path in args.batch_files] or runner.pending()
+    if not batch_files:
+        logger.info("結果を取得していないバッチはありません")
+        return
+
+    for batch_file in batch_files:
+        collected = runner.resume(batch_file, poll_interval=args.poll_interval, wait=not args.no_wait)
+        if collected is None:
+            logger.info(f"バッチはまだ完了していません: {batch_file}")
+            continue
+
+        is_weekend, results = collected
+        _write_batch_results(results, is_weekend)
+
+    logger.info("=== 週報AIレビュー（バッチ結果の取得） 終了 ===")
+
+
+def _batch_runner(args: argparse.Namespace) -> BatchReviewRunner:
+    analyzer = WeeklyReportAnalyzer()
+    work_dir = Path(settings.state_dir) / "batches"
+
+    if args.local is not None:
+        backend = LocalBatchBackend(args.local, args.responses)
+    else:
+        backend = OpenAIBatchBackend(analyzer.client)
+
+    return BatchReviewRunner(analyzer, backend, str(work_dir))
+
+
+def _write_batch_results(results: Dict[str, Dict], is_weekend: bool) -> None:
+    logger = logging.getLogger(__name__)
+    statuses = MarkdownWriter.apply_bulk(results, is_weekend, settings.vault_path)
+    failed = [file_path for file_path, ok in statuses.items() if not ok]
+    if failed:
+        logger.error(f"書き込みに失敗した週報: {failed}")
+
+
+def run_schedule(args: argparse.Namespace):
+    """複数プロファイルのレビューを1プロセスで実行"""
+    logger = logging.getLogger(__name__)
+
+    profiles_file = args.profiles or settings.profiles_file
+    if not profiles_file:
+        raise ValueError("プロファイル設定ファイルが指定されていません（--profiles または PROFILES_FILE）")
+
+    profiles = load_profiles(profiles_file)
+    logger.info(f"プロファイルを読み込みました: {[profile.name for profile in profiles]}")
+
+    scheduler = MultiProfileScheduler(
+        profiles,
+        file_workers=settings.scheduler_file_workers,
+        api_workers=settings.scheduler_api_workers,
+        global_requests_per_minute=settings.global_requests_per_minute,
+    )
+
+    if args.daemon:
+        scheduler.run_forever(args.hour, args.minute)
+    else:
+        scheduler.run_once()
+
+
+def run_export(args: argparse.Namespace):
+    """Vault全体の週報を列指向データセットにエクスポート"""
+    logger = logging.getLogger(__name__)
+
+    validate_settings(require_api_key=False)
+
+    exporter = VaultExporter(
+        settings.vault_path,
+        args.output or str(Path(settings.state_dir) / "export"),
+        settings.state_dir,
+        workers=args.workers,
+        output_format=args.format,
+    )
+    stats = exporter.export(full=args.full)
+
+    logger.info(f"エクスポート先: {', '.join(stats['files'])}")
+
+
+def run_usage(args: argparse.Namespace):
+    """API利用量（トークン数・推定コスト）の集計を表示"""
+    ledger = UsageLedger(
+        default_db_path(),
+        daily_budget=settings.daily_budget_usd,
+        monthly_budget=settings.monthly_budget_usd,
+    )
+    now = datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    for label, since, budget in (
+        ("本日", today, ledger.daily_budget),
+        ("今月", today.replace(day=1), ledger.monthly_budget),
+    ):
+        print(f"=== {label}（{since:%Y-%m-%d}〜） ===")
+        for key, stats in ledger.summary(since).items():
+            print(
+                f"{key}: {stats['calls']}回, 入力 {stats['prompt_tokens']} (キャッシュ {stats['cached_tokens']}) / "
+                f"出力 {stats['completion_tokens']} tokens, ${stats['cost_usd']:.4f}"
+            )
+        hit_rate = ledger.heuristic_hit_rate(since)
+        if hit_rate is not None:
+            print(f"平日チェックのローカル処理率: {hit_rate:.0%}")
+        budget_text = f"${budget:.2f}" if budget else "無制限"
+        print(f"合計: ${ledger.spent_since(since):.4f}（予算 {budget_text}）\n")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """コマンドライン引数をパース（引数なしの場合は通常の日次レビュー）"""
+    parser = argparse.ArgumentParser(description="週報AIレビュー")
+    subparsers = parser.add_subparsers(dest="command")
+
+    batch_parser = subparsers.add_parser("batch", help="Batch APIで複数の週報をまとめてレビュー")
+    batch_parser.add_argument("files", nargs="*", help="対象の週報ファイル（省略時はVault内の全週報）")
+    batch_parser.add_argument("--daily", action="store_true", help="平日モード（簡易チェック）でレビュー")
+    batch_parser.add_argument("--local", metavar="DIR", help="ネットワークを使わずローカルの代替バックエンドで実行")
+    batch_parser.add_argument("--responses", metavar="JSONL", help="ローカル実行時に使う記録済みの回答")
+    batch_parser.add_argument("--poll-interval", type=float, default=60, help="ポーリング間隔（秒）")
+
+    collect_parser = subparsers.add_parser("batch-collect", help="投入済みのバッチの結果を取得して書き込む（再起動後の再開用）")
+    collect_parser.add_argument("batch_files", nargs="*",
+                                help="バッチファイル（省略時は STATE_DIR/batches の未取得のバッチすべて）")
+    collect_parser.add_argument("--local", metavar="DIR", help="ローカルの代替バックエンドで投入したバッチの場合のディレクトリ")
+    collect_parser.add_argument("--responses", metavar="JSONL", help="ローカル実行時に使う記録済みの回答")
+    collect_parser.add_argument("--poll-interval", type=float, default=60, help="ポーリング間隔（秒）")
+    collect_parser.add_argument("--no-wait", action="store_true", help="完了を待たず、未完了のバッチはそのまま終了する")
+
+    schedule_parser = subparsers.add_parser("schedule", help="複数プロファイルのレビューを1プロセスで実行")
+    schedule_parser.add_argument("--profiles", metavar="JSON", help="プロファイル設定ファイル（省略時はPROFILES_FILE）")
+    schedule_parser.add_argument("--daemon", action="store_true", help="常駐して毎日指定時刻に実行")
+    schedule_parser.add_argument("--hour", type=int, default=21, help="常駐時の実行時刻（時）")
+    schedule_parser.add_argument("--minute", type=int, default=0, help="常駐時の実行時刻（分）")
+
+    export_parser = subparsers.add_parser("export", help="Vault全体の週報を集計用データセットにエクスポート")
+    export_parser.add_argument("--output", metavar="DIR", help="出力先（省略時は STATE_DIR/export）")
+    export_parser.add_argument("--format", choices=["auto", "parquet", "csv"], default="auto",
+                               help="出力形式（autoはpyarrowがあればParquet、なければCSV）")
+    export_parser.add_argument("--full", action="store_true", help="変更の有無にかかわらず全週を読み直す")
+    export_parser.add_argument("--workers", type=int, default=4, help="パースの並列数")
+
+    subparsers.add_parser("usage", help="API利用量（トークン数・推定コスト）の集計を表示")
+
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
     setup_logging()
-    main()
+    args = parse_args()
+
+    # launchdからの停止（SIGTERM）でも、キューに残ったログを書き出してから終了する
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    try:
+        if args.command == "batch":
+            run_batch(args)
+        elif args.command == "batch-collect":
+            run_batch_collect(args)
+        elif args.command == "schedule":
+            run_schedule(args)
+        elif args.command == "export":
+            run_export(args)
+        elif args.command == "usage":
+            run_usage(args)
+        else:
+            main()
+    finally:
+        log_config.shutdown_logging()
@@ -3,7 +3,7 @@
 """
 import subprocess
 import logging
-from typing import Dict
+from typing import Dict, Optional
 from linebot.v3.messaging import (
     Configuration,
     ApiClient,
@@ -65,10 +65,17 @@ class DesktopNotifier:
     def notify_weekend_review(analysis_result: Dict) -> bool:
         """週末用の詳細評価通知"""
         title = "📊 週報AI評価完了"
-        score = analysis_result.get("goal_achievement_score", 0)
-        task_rate = analysis_result.get("task_completion_rate", 0)
 
-        message = f"目標達成度: {score}点 | タスク完了率: {task_rate}%"
+        # 新テンプレート（v2）の場合
+        if "focus_achievement_score" in analysis_result:
+            score = analysis_result.get("focus_achievement_score", 0)
+            message = f"フォーカス達成度: {score}点"
+        # 旧テンプレート（v1）の場合
+        else:
+            score = analysis_result.get("goal_achievement_score", 0)
+            task_rate = analysis_result.get("task_completion_rate", 0)
+            message = f"目標達成度: {score}点 | タスク完了率: {task_rate}%"
+
         subtitle = "詳細は週報ファイルを確認してください"
 
         return DesktopNotifier.notify(title, message, subtitle)
@@ -86,24 +93,29 @@ class LINENotifier:
     """LINE Messaging API通知クラス"""
 
     @staticmethod
-    def notify(message: str) -> bool:
+    def notify(message: str, user_id: Optional[str] = None, access_token: Optional[str] = None) -> bool:
         """
         LINE通知を送信
 
         Args:
             message: 通知メッセージ
+            user_id: 送信先のUser ID（Noneの場合は設定値）
+            access_token: チャネルアクセストークン（Noneの場合は設定値）
 
         Returns:
             成功したらTrue
         """
+        user_id = user_id or settings.line_user_id
+        access_token = access_token or settings.line_channel_access_token
+
         # トークンまたはユーザーIDが設定されていない場合はスキップ
-        if not settings.line_channel_access_token or not settings.line_user_id:
+        if not access_token or not user_id:
             logger.info("LINE設定が不完全なため、LINE通知をスキップします")
             return True
 
         try:
             # LINE Messaging API設定
-            configuration = Configuration(access_token=settings.line_channel_access_token)
+            configuration = Configuration(access_token=access_token)
 
             with ApiClient(configuration) as api_client:
                 line_bot_api = MessagingApi(api_client)
@@ -111,7 +123,7 @@ class LINENotifier:
                 # プッシュメッセージを送信
                 line_bot_api.push_message(
                     PushMessageRequest(
-                        to=settings.line_user_id,
+                        to=user_id,
                         messages=[TextMessage(text=message)]
                     )
                 )
@@ -124,7 +136,8 @@ class LINENotifier:
             return False
 
     @staticmethod
-    def notify_daily_reminder(analysis_result: Dict) -> bool:
+    def notify_daily_reminder(analysis_result: Dict, user_id: Optional[str] = None,
+                              access_token: Optional[str] = None) -> bool:
         """平日用の簡易リマインド通知"""
         message = f"""📝 週報AIチェック
 
@@ -138,10 +151,11 @@ class LINENotifier:
         if mood_comment:
             message += f"\n\n😊 {mood_comment}"
 
-        return LINENotifier.notify(message)
+        return LINENotifier.notify(message, user_id, access_token)
 
     @staticmethod
-    def notify_weekend_review(analysis_result: Dict) -> bool:
+    def notify_weekend_review(analysis_result: Dict, user_id: Optional[str] = None,
+                              access_token: Optional[str] = None) -> bool:
         """週末用の詳細評価通知"""
         # 新テンプレート（v2）の場合
         if 'focus_achievement_score' in analysis_result:
@@ -186,4 +200,4 @@ class LINENotifier:
 
             message += "\n\n詳細は週報ファイルをチェック！"
 
-        return LINENotifier.notify(message)
+        return LINENotifier.notify(message, user_id, access_token)
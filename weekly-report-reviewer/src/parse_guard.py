@@ -0,0 +1,214 @@
+"""
+週報パースの実行時ガードモジュール
+
+巨大・異常な週報でジョブが止まらないよう、サイズ上限とパースの制限時間を設け、
+超過した場合は縮退したサマリにフォールバックする
+
+正規表現のバックトラックはGILを手放さずスレッドからは止められないため、
+制限時間つきのパースは子プロセスで実行し、超過したら子プロセスごと強制終了する
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from typing import Callable, Optional, Tuple, TypeVar
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 制限時間を超えた場合に再パースする先頭部分のサイズ
+DEGRADED_BYTES = 64 * 1024
+
+# 子プロセスの起動（spawnではインタプリタの起動とimportを含む）を待つ上限。パースの制限時間には含めない
+STARTUP_TIMEOUT_SECONDS = 30.0
+
+# 子プロセスが起動を終えたことを親に知らせるメッセージ
+_READY = "ready"
+
+
+class ParseTimeout(Exception):
+    """パースが制限時間内に終わらなかった"""
+
+
+def _serve(conn) -> None:
+    """子プロセスでパースを繰り返し実行する（親が接続を閉じたら終了）"""
+    conn.send(_READY)
+    while True:
+        try:
+            build, content = conn.recv()
+        except EOFError:
+            return
+
+        try:
+            outcome = (True, build(content))
+        except Exception as e:
+            outcome = (False, e)
+
+        try:
+            conn.send(outcome)
+        except Exception as e:
+            # 結果・例外がpickleできない場合も親を待たせない
+            conn.send((False, RuntimeError(f"パース結果を受け渡せませんでした: {e}")))
+
+
+class _ParseWorker:
+    """
+    パース用の子プロセス
+
+    起動のコストを抑えるため呼び出しをまたいで使い回し、制限時間を超えたら強制終了して
+    次の呼び出しで起動し直す。制限時間は子プロセスの起動完了を受け取ってから数える
+    """
+
+    def __init__(self):
+        # forkした子プロセスは親のスレッドのワーカーを引き継ぐが、親の子プロセスは操作できない
+        self.owner_pid = os.getpid()
+        self._process = None
+        self._conn = None
+
+    def run(self, build: Callable[[str], T], content: str, timeout: float) -> T:
+        if self._process is None or not self._process.is_alive():
+            self._start()
+
+        try:
+            self._conn.send((build, content))
+            ready = self._conn.poll(timeout)
+        except (BrokenPipeError, EOFError, OSError):
+            self._stop()
+            raise
+
+        if not ready:
+            self._stop()
+            raise ParseTimeout()
+
+        try:
+            ok, value = self._conn.recv()
+        except EOFError:
+            self._stop()
+            raise RuntimeError("パース用の子プロセスが異常終了しました")
+
+        if not ok:
+            raise value
+        return value
+
+    def _start(self) -> None:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        # 親が異常終了しても子プロセスが残らないようデーモンにする
+        self._process = multiprocessing.Process(target=_serve, args=(child_conn,), name="parse-guard", daemon=True)
+        self._process.start()
+        child_conn.close()
+        self._conn = parent_conn
+
+        try:
+            ready = parent_conn.poll(STARTUP_TIMEOUT_SECONDS) and parent_conn.recv() == _READY
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self._stop()
+            raise RuntimeError("パース用の子プロセスを起動できませんでした")
+
+    def _stop(self) -> None:
+        if self._process is not None and self._process.is_alive():
+            self._process.kill()
+        if self._process is not None:
+            self._process.join()
+        if self._conn is not None:
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+
+# 子プロセスは呼び出し元のスレッドごとに持つ（スケジューラのスレッドどうしで待たせない）
+_workers = threading.local()
+
+
+class ParseGuard:
+    """サイズ上限と制限時間つきで週報をパースするクラス"""
+
+    def __init__(self, max_bytes: Optional[int] = None, max_line_chars: Optional[int] = None,
+                 deadline_seconds: Optional[float] = None):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.max_report_bytes
+        self.max_line_chars = max_line_chars if max_line_chars is not None else settings.max_line_chars
+        self.deadline_seconds = (
+            deadline_seconds if deadline_seconds is not None else settings.parse_deadline_seconds
+        )
+
+    def parse(self, build: Callable[[str], T], content: str, label: str = "") -> Tuple[T, bool]:
+        """
+        サイズを制限した本文でbuildを実行する
+
+        制限時間を超えた場合は先頭部分だけで再実行し、それも超えた場合は空の本文で実行する
+
+        Args:
+            build: 本文を受け取り、パース結果を返す関数（制限時間を設ける場合はpickle可能なもの）
+            content: 週報の本文
+            label: ログ出力用の名前（ファイルパスなど）
+
+        Returns:
+            (パース結果, 縮退したかどうか)
+        """
+        # 長すぎる行の切り詰めではセクションは欠けないため、縮退扱いにするのはサイズの上限だけ
+        limited, truncated = self._truncate_bytes(content, self.max_bytes)
+        if truncated:
+            logger.warning(f"週報が上限を超えたため切り詰めました: {label}")
+        limited, clipped = self._clip_lines(limited)
+        if clipped:
+            logger.info(f"週報の長すぎる行を切り詰めました: {label}")
+
+        try:
+            return self._run_with_deadline(build, limited), truncated
+        except ParseTimeout:
+            logger.error(f"パースが制限時間（{self.deadline_seconds}秒）を超えたため縮退します: {label}")
+
+        head, _ = self._truncate_bytes(limited, DEGRADED_BYTES)
+        try:
+            return self._run_with_deadline(build, head), True
+        except ParseTimeout:
+            logger.error(f"縮退したパースも制限時間を超えたため空のサマリを使用します: {label}")
+            return build(""), True
+
+    def _clip_lines(self, content: str) -> Tuple[str, bool]:
+        """1行の長さの上限を超えた行を切り詰める"""
+        if not self.max_line_chars or len(content) <= self.max_line_chars:
+            return content, False
+
+        lines = content.split("\n")
+        if not any(len(line) > self.max_line_chars for line in lines):
+            return content, False
+
+        return "\n".join(
+            line[:self.max_line_chars] + "…" if len(line) > self.max_line_chars else line
+            for line in lines
+        ), True
+
+    @staticmethod
+    def _truncate_bytes(content: str, max_bytes: int) -> Tuple[str, bool]:
+        """UTF-8でmax_bytes以内になるよう、行単位で切り詰める"""
+        # 1文字は最大4バイトなので、文字数が上限の1/4以下なら確実に収まる
+        if not max_bytes or len(content) * 4 <= max_bytes:
+            return content, False
+
+        encoded = content.encode("utf-8")
+        if len(encoded) <= max_bytes:
+            return content, False
+
+        head = encoded[:max_bytes].decode("utf-8", errors="ignore")
+        newline = head.rfind("\n")
+        return (head[:newline] if newline > 0 else head), True
+
+    def _run_with_deadline(self, build: Callable[[str], T], content: str) -> T:
+        """
+        子プロセスでbuildを実行し、制限時間を超えたら子プロセスを強制終了してParseTimeoutを送出する
+
+        buildと戻り値は子プロセスとの受け渡しのためpickle可能である必要がある
+        （モジュールレベルの関数や、そのfunctools.partial）
+        """
+        if not self.deadline_seconds:
+            return build(content)
+
+        worker = getattr(_workers, "worker", None)
+        if worker is None or worker.owner_pid != os.getpid():
+            worker = _workers.worker = _ParseWorker()
+        return worker.run(build, content, self.deadline_seconds)
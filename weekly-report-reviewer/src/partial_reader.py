@@ -0,0 +1,166 @@
+"""
+週報の部分読み込みモジュール
+
+貼り付けたログや埋め込み画像（base64）で数MBになった週報でも、ファイル全体を
+メモリに読み込まずに、必要なセクションを読み終えた時点で読み込みを打ち切る
+"""
+import io
+import codecs
+import logging
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from config.settings import settings
+from src.templates import TEMPLATE_REGISTRY, TemplateGrammar
+
+logger = logging.getLogger(__name__)
+
+# 一度に読み込むバイト数
+CHUNK_SIZE = 64 * 1024
+
+# 全セクションの見出しを読んだ後、最後のセクションに次の見出しが来ない場合に読み続ける上限
+TAIL_SECTION_BYTES = 64 * 1024
+
+
+class _SectionTracker:
+    """読み込んだ見出しを記録し、読み込みを打ち切れるかを判定する"""
+
+    def __init__(self, grammars: Sequence[TemplateGrammar], tail_bytes: int):
+        self.grammars = grammars
+        self.tail_bytes = tail_bytes
+        self.seen = {grammar.version: set() for grammar in grammars}
+        self.complete: Optional[TemplateGrammar] = None
+        self.tail = 0
+
+    def should_stop(self, line: str, line_bytes: int) -> bool:
+        """この行の手前で読み込みを打ち切るか"""
+        if self.complete is not None:
+            # 最後のセクションは次の見出しで終わる（見出しがなければ上限まで読む）
+            if self.complete.heading_line.match(line):
+                return True
+            self.tail += line_bytes
+            return self.tail > self.tail_bytes
+
+        for grammar in self.grammars:
+            if not grammar.heading_line.match(line):
+                continue
+
+            rule = grammar.rule_for(line)
+            if rule is None:
+                continue
+
+            seen = self.seen[grammar.version]
+            seen.add(rule.key)
+            if len(seen) == len(grammar.rules):
+                self.complete = grammar
+                break
+
+        return False
+
+
+class PartialReader:
+    """
+    週報をストリームで読み込み、必要なセクションだけを取り出すクラス
+
+    UTF-8はチャンクごとに逐次デコードし、1行の長さ・全体のサイズも読みながら制限するため、
+    メモリ使用量はファイルサイズではなく取り出したセクションの大きさに比例する。
+    いずれかのテンプレートの見出しがすべて揃い、最後のセクションが終わった時点で読み込みを打ち切る。
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None, max_line_chars: Optional[int] = None,
+                 grammars: Optional[Sequence[TemplateGrammar]] = None, chunk_size: int = CHUNK_SIZE,
+                 tail_bytes: int = TAIL_SECTION_BYTES):
+        self.max_bytes = max_bytes if max_bytes is not None else settings.max_report_bytes
+        self.max_line_chars = max_line_chars if max_line_chars is not None else settings.max_line_chars
+        self.grammars = grammars if grammars is not None else list(TEMPLATE_REGISTRY.values())
+        self.chunk_size = chunk_size
+        self.tail_bytes = tail_bytes
+
+    def read(self, file_path: str) -> Tuple[str, bool, bool]:
+        """
+        週報を読み込む
+
+        Returns:
+            (読み込んだ本文, サイズ・行の長さの上限で切り詰めたかどうか,
+             サイズの上限で必要なセクションを読み切れなかったかどうか)
+        """
+        tracker = _SectionTracker(self.grammars, self.tail_bytes)
+        # 短い行が大量にあっても行ごとの文字列オブジェクトを保持しないよう、バッファに書き足す
+        kept = io.StringIO()
+        kept_bytes = 0
+        truncated = False
+        incomplete = False
+        stopped_early = False
+
+        with open(file_path, "rb") as f:
+            for line, cut in self._lines(f):
+                truncated = truncated or cut
+                body = line.rstrip("\n")
+                line_bytes = len(line.encode("utf-8"))
+
+                if tracker.should_stop(body, line_bytes):
+                    stopped_early = True
+                    break
+
+                if self.max_bytes and kept_bytes + line_bytes > self.max_bytes:
+                    truncated = True
+                    # 見出しがすべて揃う前に上限に達した場合だけ、必要なセクションが欠けている
+                    incomplete = tracker.complete is None
+                    break
+
+                kept.write(line)
+                kept_bytes += line_bytes
+
+        if stopped_early:
+            logger.debug(f"必要なセクションを読み終えたため読み込みを打ち切りました: {file_path} ({kept_bytes} bytes)")
+
+        return kept.getvalue(), truncated, incomplete
+
+    def _lines(self, f) -> Iterator[Tuple[str, bool]]:
+        """
+        バイナリファイルから1行ずつ取り出す（改行は\\nに統一）
+
+        Yields:
+            (行, 長すぎたため切り詰めたかどうか)
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        limit = self.max_line_chars
+        pending: List[str] = []
+        pending_chars = 0
+        cut = False
+
+        while True:
+            chunk = f.read(self.chunk_size)
+            text = decoder.decode(chunk, final=not chunk)
+            start = 0
+
+            while start < len(text):
+                newline = text.find("\n", start)
+                end = len(text) if newline < 0 else newline
+                piece = text[start:end]
+
+                # 長すぎる行（埋め込み画像など）は上限を超えた部分を保持しない
+                if limit and pending_chars + len(piece) > limit:
+                    piece = piece[:max(limit - pending_chars, 0)]
+                    cut = True
+                pending.append(piece)
+                pending_chars += len(piece)
+
+                if newline < 0:
+                    break
+
+                yield self._finish_line(pending, cut) + "\n", cut
+                pending, pending_chars, cut = [], 0, False
+                start = newline + 1
+
+            if not chunk:
+                break
+
+        if pending:
+            yield self._finish_line(pending, cut), cut
+
+    @staticmethod
+    def _finish_line(pieces: List[str], cut: bool) -> str:
+        line = "".join(pieces)
+        if line.endswith("\r"):
+            line = line[:-1]
+        return line + "…" if cut else line
@@ -0,0 +1,197 @@
+"""
+実行の排他制御モジュール
+
+launchdの定時実行と手動実行・スリープ復帰後の実行が重なっても、
+同じVault・同じ週のレビューは1プロセスだけが行い、後から来た実行は
+その結果を待って再利用する（single-flight）
+"""
+import os
+import json
+import time
+import fcntl
+import socket
+import hashlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# ロックの空き確認の間隔（秒）
+POLL_INTERVAL = 0.5
+
+
+class RunLockTimeout(Exception):
+    """ロックを待つ時間が上限を超えた"""
+
+
+class SingleFlight:
+    """
+    Vault・週ごとのプロセス間ロック
+
+    ロックはflockで取得するため、保持していたプロセスが異常終了してもOSが解放する。
+    ロックファイルには保持者の情報を書き、解放の記録がないまま空いていたロックは
+    異常終了した実行の残骸として検出してログに残す。
+
+    使い方:
+        with SingleFlight(state_dir, key, "daily") as flight:
+            if flight.shared_result is not None:
+                return flight.shared_result  # 別プロセスの実行結果を再利用
+            result = ...
+            flight.publish(result)
+    """
+
+    def __init__(self, state_dir: str, key: str, mode: str, wait_timeout: Optional[float] = None,
+                 reuse_seconds: Optional[float] = None, reuse: bool = True):
+        """
+        Args:
+            state_dir: 状態ファイルの保存先
+            key: ロックのキー（Vault・週ごと）
+            mode: 実行モード（"daily"/"weekend"、モードが違う結果は再利用しない）
+            wait_timeout: ロックを待つ最大時間（秒）
+            reuse_seconds: 直前に完了した結果を再利用する期間（秒）
+            reuse: 他の実行の結果を再利用するかどうか（書き込みの排他だけが目的ならFalse）
+        """
+        lock_dir = Path(state_dir) / "locks"
+        self.lock_path = lock_dir / f"{key}.lock"
+        self.result_path = lock_dir / f"{key}.result.json"
+        self.key = key
+        self.mode = mode
+        self.wait_timeout = wait_timeout if wait_timeout is not None else settings.run_lock_timeout_seconds
+        self.reuse_seconds = reuse_seconds if reuse_seconds is not None else settings.run_reuse_seconds
+        self.reuse = reuse
+        self.shared_result: Optional[Dict] = None
+        self._file = None
+
+    def __enter__(self) -> "SingleFlight":
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        waiting_since = datetime.now()
+        waited = self._acquire()
+
+        previous = self._read_holder()
+        if previous and not previous.get("released_at"):
+            logger.warning(
+                f"異常終了した実行のロックを回収しました: {self.key} "
+                f"(pid {previous.get('pid')}@{previous.get('host')}, 開始 {previous.get('started_at')})"
+            )
+        self._write_holder({
+            "pid": os.getpid(),
+            "host": socket.gethostname(),
+            "mode": self.mode,
+            "started_at": datetime.now().isoformat(timespec="seconds"),
+        })
+
+        if self.reuse:
+            self.shared_result = self._load_shared_result(waiting_since if waited else None)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        try:
+            holder = self._read_holder() or {}
+            holder["released_at"] = datetime.now().isoformat(timespec="seconds")
+            self._write_holder(holder)
+        finally:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+    def publish(self, result: Dict) -> None:
+        """実行結果を、待っている（または直後に来る）実行のために保存する"""
+        data = {
+            "mode": self.mode,
+            "completed_at": datetime.now().isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "result": result,
+        }
+        tmp_path = self.result_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(self.result_path)
+
+    def _acquire(self) -> bool:
+        """
+        ロックを取得する（保持されていれば解放されるまで待つ）
+
+        Returns:
+            待たされたかどうか
+        """
+        # ロックファイルは削除しない（削除と取得が競合すると2プロセスが同時に保持できてしまうため）
+        self._file = open(self.lock_path, "a+", encoding="utf-8")
+        deadline = time.monotonic() + self.wait_timeout
+        waited = False
+
+        while True:
+            try:
+                fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return waited
+            except BlockingIOError:
+                pass
+
+            if not waited:
+                holder = self._read_holder() or {}
+                logger.info(
+                    f"同じ週のレビューが実行中のため完了を待ちます: {self.key} "
+                    f"(pid {holder.get('pid')}, 開始 {holder.get('started_at')})"
+                )
+                waited = True
+
+            if time.monotonic() >= deadline:
+                self._file.close()
+                self._file = None
+                raise RunLockTimeout(f"ロックの待ち時間が上限（{self.wait_timeout}秒）を超えました: {self.key}")
+            time.sleep(POLL_INTERVAL)
+
+    def _read_holder(self) -> Optional[Dict]:
+        self._file.seek(0)
+        text = self._file.read()
+        if not text.strip():
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def _write_holder(self, holder: Dict) -> None:
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(json.dumps(holder, ensure_ascii=False))
+        self._file.flush()
+
+    def _load_shared_result(self, waiting_since: Optional[datetime]) -> Optional[Dict]:
+        """
+        再利用できる結果を読み込む
+
+        待っている間に完了した結果、または直前（reuse_seconds以内）に完了した同じモードの結果を再利用する
+        """
+        if not self.result_path.exists():
+            return None
+
+        try:
+            with open(self.result_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            completed_at = datetime.fromisoformat(data["completed_at"])
+        except Exception as e:
+            logger.warning(f"前回の実行結果の読み込みに失敗: {e}")
+            return None
+
+        if data.get("mode") != self.mode:
+            return None
+
+        in_flight = waiting_since is not None and completed_at >= waiting_since.replace(microsecond=0)
+        recent = (datetime.now() - completed_at).total_seconds() <= self.reuse_seconds
+        if not (in_flight or recent):
+            return None
+
+        logger.info(f"別の実行（pid {data.get('pid')}, 完了 {data['completed_at']}）の結果を再利用します: {self.key}")
+        return data["result"]
+
+
+def week_flight(vault_path: str, file_path: str, is_weekend: bool, state_dir: Optional[str] = None,
+                reuse: bool = True) -> SingleFlight:
+    """Vault・週（週報ファイル）ごとのSingleFlightを生成"""
+    vault_hash = hashlib.sha1(str(Path(vault_path).resolve()).encode("utf-8")).hexdigest()[:10]
+    key = f"{vault_hash}_{Path(file_path).stem}"
+    return SingleFlight(state_dir or settings.state_dir, key, "weekend" if is_weekend else "daily", reuse=reuse)
@@ -0,0 +1,285 @@
+"""
+複数プロファイル（複数Vault・複数ユーザー）のレビューを1プロセスで実行するスケジューラ
+
+ファイルのパース・書き込みはワーカープロセスのプールで、API呼び出しはスレッドプールで実行し、
+OpenAIクライアントはAPIキーごとに共有する
+"""
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+from typing import Dict, List, Optional
+
+from openai import OpenAI
+
+from config.settings import settings
+from config.profiles import Profile
+from src import log_config
+from src.vault_reader import VaultReader
+from src.analyzer import WeeklyReportAnalyzer
+from src.writer import MarkdownWriter
+from src.notifier import LINENotifier
+from src.rate_limiter import RateLimiter
+from src.run_lock import week_flight
+from src.snapshot_store import SnapshotStore
+from src.usage_ledger import UsageLedger, default_db_path
+
+logger = logging.getLogger(__name__)
+
+
+def load_profile_reports(vault_path: str) -> Optional[Dict]:
+    """
+    今週と前週の週報を読み込んでパースする（ワーカープロセスで実行）
+
+    Returns:
+        {"file_path": str, "template_version": str, "summary": dict, "prev_kpt": dict, "unreadable": bool}、
+        または今週の週報がなければNone
+    """
+    reader = VaultReader(vault_path)
+    report = reader.read_weekly_report()
+    if report is None:
+        return None
+
+    prev_report = reader.read_previous_week_report(fields=("kpt",))
+    prev_kpt = prev_report.get_summary(fields=("kpt",)).get("kpt", {}) if prev_report else {}
+
+    return {
+        "file_path": report.file_path,
+        "template_version": report.template_version,
+        "summary": report.get_summary(),
+        "prev_kpt": prev_kpt,
+        "unreadable": report.unreadable,
+    }
+
+
+class SchedulerMetrics:
+    """スケジューラのスループットとプロファイル間の公平性を集計するクラス"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+        self._records: Dict[str, List[Dict]] = {}
+
+    def record(self, profile_name: str, ok: bool, wait: float, latency: float) -> None:
+        """1レビュー分の結果を記録"""
+        with self._lock:
+            self._records.setdefault(profile_name, []).append({
+                "ok": ok,
+                "wait": wait,
+                "latency": latency,
+            })
+
+    def report(self) -> Dict:
+        """
+        集計結果を返す
+
+        fairnessはプロファイルごとの処理レート（レビュー数 / 待ち時間+処理時間）に対する
+        Jainの公平性指数（1.0で完全に公平）
+        """
+        elapsed = time.monotonic() - self.started
+        per_profile = {}
+        rates = []
+
+        with self._lock:
+            records = {name: list(items) for name, items in self._records.items()}
+
+        for name, items in records.items():
+            total_time = sum(item["wait"] + item["latency"] for item in items)
+            succeeded = sum(1 for item in items if item["ok"])
+            per_profile[name] = {
+                "reviews": succeeded,
+                "failures": len(items) - succeeded,
+                "avg_wait": sum(item["wait"] for item in items) / len(items),
+                "avg_latency": sum(item["latency"] for item in items) / len(items),
+            }
+            rates.append(len(items) / total_time if total_time > 0 else 0)
+
+        reviews = sum(stats["reviews"] for stats in per_profile.values())
+        squares = sum(rate * rate for rate in rates)
+
+        return {
+            "reviews": reviews,
+            "elapsed_seconds": elapsed,
+            "reviews_per_minute": reviews / elapsed * 60 if elapsed > 0 else 0,
+            "fairness": sum(rates) ** 2 / (len(rates) * squares) if squares > 0 else 1.0,
+            "per_profile": per_profile,
+        }
+
+
+class MultiProfileScheduler:
+    """複数プロファイルのレビューをまとめて実行するクラス"""
+
+    def __init__(self, profiles: List[Profile], file_workers: int = 2, api_workers: int = 8,
+                 global_requests_per_minute: float = 60):
+        self.profiles = profiles
+        self.file_workers = file_workers
+        self.api_workers = api_workers
+        self.global_limiter = RateLimiter(global_requests_per_minute)
+        self.profile_limiters = {
+            profile.name: RateLimiter(profile.requests_per_minute) for profile in profiles
+        }
+        self._clients: Dict[str, OpenAI] = {}
+        self._clients_lock = threading.Lock()
+        self._run_count = 0
+        # 利用量の台帳と予算は全プロファイルで共有する
+        self.usage_db = default_db_path()
+
+    def _client_for(self, api_key: str) -> OpenAI:
+        """APIキーごとに共有するOpenAIクライアントを取得"""
+        with self._clients_lock:
+            if api_key not in self._clients:
+                self._clients[api_key] = OpenAI(api_key=api_key)
+            return self._clients[api_key]
+
+    def _analyzer_for(self, profile: Profile) -> WeeklyReportAnalyzer:
+        """プロファイル用のAnalyzerを生成（レート制限はプロファイル→全体の順に確保）"""
+        return WeeklyReportAnalyzer(
+            snapshot_store=SnapshotStore(str(Path(settings.state_dir) / "profiles" / profile.name)),
+            client=self._client_for(profile.resolved_api_key()),
+            model=profile.resolved_model(),
+            rate_limiters=(self.profile_limiters[profile.name], self.global_limiter),
+            ledger=UsageLedger(
+                self.usage_db,
+                daily_budget=settings.daily_budget_usd,
+                monthly_budget=settings.monthly_budget_usd,
+                profile=profile.name,
+            ),
+        )
+
+    def _ordered_profiles(self) -> List[Profile]:
+        """毎回同じプロファイルが後回しにならないよう、実行ごとに開始位置をずらす"""
+        if not self.profiles:
+            return []
+        offset = self._run_count % len(self.profiles)
+        return self.profiles[offset:] + self.profiles[:offset]
+
+    def run_once(self, is_weekend: Optional[bool] = None) -> Dict:
+        """
+        全プロファイルの今週の週報をレビュー
+
+        Returns:
+            SchedulerMetrics.report()の結果
+        """
+        if is_weekend is None:
+            is_weekend = WeeklyReportAnalyzer.is_weekend()
+
+        metrics = SchedulerMetrics()
+        profiles = self._ordered_profiles()
+        self._run_count += 1
+
+        logger.info(f"{len(profiles)}件のプロファイルをレビューします（{'週末詳細評価' if is_weekend else '平日簡易チェック'}）")
+
+        # spawnで起動するワーカー（macOS）もログファイルに書き込めるよう、ロギングを設定する
+        file_pool = ProcessPoolExecutor(
+            max_workers=self.file_workers,
+            initializer=log_config.init_child_logging,
+            initargs=(log_config.child_config(),),
+        )
+        with file_pool, ThreadPoolExecutor(max_workers=self.api_workers) as api_pool:
+            parse_futures = {
+                file_pool.submit(load_profile_reports, profile.vault_path): profile
+                for profile in profiles
+            }
+            review_futures = []
+
+            for future in as_completed(parse_futures):
+                profile = parse_futures[future]
+
+                try:
+                    loaded = future.result()
+                except Exception as e:
+                    logger.error(f"[{profile.name}] 週報の読み込みエラー: {e}")
+                    metrics.record(profile.name, False, 0, 0)
+                    continue
+
+                if loaded is None:
+                    logger.warning(f"[{profile.name}] 今週の週報ファイルが見つかりません")
+                    continue
+
+                review_futures.append(api_pool.submit(
+                    self._review, profile, loaded, is_weekend, file_pool, metrics, time.monotonic()
+                ))
+
+            wait(review_futures)
+
+        report = metrics.report()
+        logger.info(
+            f"レビュー完了: {report['reviews']}件 / {report['elapsed_seconds']:.1f}秒 "
+            f"({report['reviews_per_minute']:.1f}件/分, 公平性 {report['fairness']:.2f})"
+        )
+        return report
+
+    def _review(self, profile: Profile, loaded: Dict, is_weekend: bool,
+                file_pool: ProcessPoolExecutor, metrics: SchedulerMetrics, queued_at: float) -> None:
+        """1プロファイル分のレビュー（APIスレッドで実行）"""
+        started = time.monotonic()
+        ok = False
+
+        try:
+            file_path = loaded["file_path"]
+            template_version = loaded["template_version"]
+            prev_kpt = loaded["prev_kpt"]
+
+            # 空のサマリで分析すると、AIサマリを中身のない結果で上書きしてしまう
+            if loaded.get("unreadable"):
+                logger.error(f"[{profile.name}] 週報をパースできなかったため、分析・書き込みをスキップしました: {file_path}")
+                return
+
+            # 別プロセスで同じ週のレビューが実行中なら完了を待ち、その結果を再利用する
+            with week_flight(profile.vault_path, file_path, is_weekend) as flight:
+                if flight.shared_result is not None:
+                    ok = True
+                    return
+
+                if prev_kpt.get("problem") or prev_kpt.get("try"):
+                    file_pool.submit(
+                        MarkdownWriter.update_prev_week_section, file_path, prev_kpt, template_version
+                    ).result()
+
+                analysis_result = self._analyzer_for(profile).analyze(loaded["summary"], is_weekend)
+                if analysis_result is None:
+                    logger.warning(f"[{profile.name}] AIの利用予算の上限に達したため、本日のチェックはスキップしました")
+                    return
+
+                ok = file_pool.submit(
+                    MarkdownWriter.update_ai_summary, file_path, analysis_result, is_weekend, template_version
+                ).result()
+                if not ok:
+                    logger.error(f"[{profile.name}] 週報の書き込みに失敗しました")
+                    return
+
+                flight.publish(analysis_result)
+
+            user_id = profile.line_user_id or None
+            access_token = profile.resolved_line_token() or None
+            if user_id:
+                if is_weekend:
+                    LINENotifier.notify_weekend_review(analysis_result, user_id, access_token)
+                else:
+                    LINENotifier.notify_daily_reminder(analysis_result, user_id, access_token)
+
+            logger.info(f"[{profile.name}] レビューが完了しました")
+
+        except Exception as e:
+            logger.error(f"[{profile.name}] レビュー中にエラーが発生しました: {e}", exc_info=True)
+
+        finally:
+            metrics.record(profile.name, ok, started - queued_at, time.monotonic() - started)
+
+    def run_forever(self, hour: int = 21, minute: int = 0) -> None:
+        """毎日指定時刻にrun_onceを実行し続ける（プロセスを常駐させてコールドスタートを避ける）"""
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+
+            logger.info(f"次回のレビュー: {next_run:%Y-%m-%d %H:%M}")
+            time.sleep((next_run - now).total_seconds())
+
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error(f"スケジュール実行でエラーが発生しました: {e}", exc_info=True)
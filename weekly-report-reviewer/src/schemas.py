@@ -0,0 +1,144 @@
+"""
+分析結果のスキーマ定義モジュール
+
+OpenAI APIの回答をpydanticモデルで検証し、欠落・不正なフィールドを特定する
+"""
+import re
+from functools import lru_cache
+from typing import Annotated, Any, Dict, List, Tuple, Type
+
+from pydantic import BaseModel, BeforeValidator, Field, TypeAdapter, ValidationError
+
+
+def _coerce_score(value: Any) -> Any:
+    """「80点」「75%」「82.5」のような表記を整数スコアに変換"""
+    if isinstance(value, str):
+        match = re.search(r"-?\d+(?:\.\d+)?", value)
+        if match:
+            value = float(match.group(0))
+    if isinstance(value, float):
+        return round(value)
+    return value
+
+
+def _coerce_suggestions(value: Any) -> Any:
+    """改行区切りの文字列で返ってきたサジェストを配列に変換"""
+    if isinstance(value, str):
+        lines = [re.sub(r"^\s*(?:[-・*]|\d+[.)．])\s*", "", line) for line in value.split("\n")]
+        return [line for line in lines if line.strip()]
+    return value
+
+
+Score = Annotated[int, BeforeValidator(_coerce_score), Field(ge=0, le=100)]
+Suggestions = Annotated[List[str], BeforeValidator(_coerce_suggestions), Field(min_length=1)]
+
+
+class DailyResult(BaseModel):
+    """平日の簡易チェック結果"""
+
+    message: str = Field(description="リマインドメッセージ（150字以内）")
+    mood_comment: str = Field("", description="調子に関するコメント（50字以内、ない場合は空文字）")
+
+
+class WeekendV2Result(BaseModel):
+    """週末の詳細評価結果（新テンプレートv2）"""
+
+    focus_achievement_score: Score = Field(description="フォーカス達成度 (0-100の整数)")
+    mood_trend: str = Field(description="気分の傾向分析（100字程度）")
+    reflection_insights: str = Field(description="振り返りの洞察（150字程度）")
+    kpt_feedback: str = Field(description="KPTに対するフィードバック（100字程度）")
+    overall_summary: str = Field(description="総合評価コメント（200字程度）")
+    next_week_suggestions: Suggestions = Field(description="来週の目標サジェスト（配列、3項目、各50字以内）")
+
+
+class WeekendV1Result(BaseModel):
+    """週末の詳細評価結果（旧テンプレートv1）"""
+
+    goal_achievement_score: Score = Field(description="目標達成度 (0-100の整数)")
+    task_completion_rate: Score = Field(description="タスク完了率 (0-100の整数)")
+    good_bad_analysis: str = Field(description="Good/Badパターン分析（150字程度）")
+    annual_goal_alignment: str = Field(description="年度目標との整合性（100字程度）")
+    overall_summary: str = Field(description="総合評価コメント（200字程度）")
+    next_week_suggestions: Suggestions = Field(description="来週の目標サジェスト（配列、3項目、各50字以内）")
+
+
+RESULT_MODELS: Dict[str, Type[BaseModel]] = {
+    "daily": DailyResult,
+    "weekend_v1": WeekendV1Result,
+    "weekend_v2": WeekendV2Result,
+}
+
+
+@lru_cache(maxsize=None)
+def get_validator(kind: str) -> TypeAdapter:
+    """結果種別ごとのバリデータを取得（コンパイル済みのものをキャッシュ）"""
+    return TypeAdapter(RESULT_MODELS[kind])
+
+
+@lru_cache(maxsize=None)
+def get_field_validator(kind: str, field_name: str) -> TypeAdapter:
+    """フィールド単位のバリデータを取得（コンパイル済みのものをキャッシュ）"""
+    field = RESULT_MODELS[kind].model_fields[field_name]
+    if not field.metadata:
+        return TypeAdapter(field.annotation)
+    return TypeAdapter(Annotated[(field.annotation, *field.metadata)])
+
+
+def validate_partial(kind: str, raw: Any) -> Tuple[Dict, List[str]]:
+    """
+    回答を検証し、有効なフィールドと再要求が必要なフィールドに分ける
+
+    Args:
+        kind: 結果種別（"daily" / "weekend_v1" / "weekend_v2"）
+        raw: json.loadsの結果
+
+    Returns:
+        (検証済みフィールドのdict, 欠落・不正なフィールド名のリスト)
+    """
+    model = RESULT_MODELS[kind]
+    if not isinstance(raw, dict):
+        raw = {}
+
+    try:
+        return get_validator(kind).validate_python(raw).model_dump(), []
+    except ValidationError:
+        pass
+
+    valid = {}
+    missing = []
+
+    for name, field in model.model_fields.items():
+        if name not in raw:
+            if field.is_required():
+                missing.append(name)
+            else:
+                valid[name] = field.default
+            continue
+
+        try:
+            valid[name] = get_field_validator(kind, name).validate_python(raw[name])
+        except ValidationError:
+            missing.append(name)
+
+    return valid, missing
+
+
+def stub_result(kind: str) -> Dict:
+    """ネットワークなしで動作確認するためのスタブ回答を生成"""
+    stub = {}
+
+    for name, field in RESULT_MODELS[kind].model_fields.items():
+        if field.annotation is int:
+            stub[name] = 50
+        elif field.annotation is str:
+            stub[name] = f"（スタブ）{field.description}"
+        else:
+            stub[name] = [f"（スタブ）{field.description}"]
+
+    return stub
+
+
+def describe_fields(kind: str, field_names: List[str]) -> str:
+    """プロンプト用のフィールド説明を生成"""
+    fields = RESULT_MODELS[kind].model_fields
+    return "\n".join(f"- {name}: {fields[name].description}" for name in field_names)
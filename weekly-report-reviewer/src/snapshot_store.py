@@ -0,0 +1,178 @@
+"""
+前回分析時の週報スナップショットを保存・比較するモジュール
+
+平日チェックで前回からの差分だけをプロンプトに含めるために使用する
+"""
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotStore:
+    """週ごとのスナップショットをJSONファイルとして保存するクラス"""
+
+    def __init__(self, state_dir: str):
+        self.snapshot_dir = Path(state_dir) / "snapshots"
+        self.result_dir = Path(state_dir) / "results"
+
+    @staticmethod
+    def week_key(file_path: str) -> str:
+        """週報ファイルパスから週のキー（例: 2026-W02）を取得"""
+        return Path(file_path).stem
+
+    def _path(self, week_key: str) -> Path:
+        return self.snapshot_dir / f"{week_key}.json"
+
+    def load(self, week_key: str) -> Optional[Dict]:
+        """
+        スナップショットを読み込む
+
+        Returns:
+            {"summary": ..., "result": ..., "analyzed_at": ...}、またはNone
+        """
+        path = self._path(week_key)
+        if not path.exists():
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"スナップショットの読み込みに失敗: {e}")
+            return None
+
+    def save(self, week_key: str, summary: Dict, result: Dict) -> None:
+        """分析したサマリと結果をスナップショットとして保存"""
+        snapshot = {
+            "summary": self.compact_summary(summary),
+            "result": result,
+            "analyzed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        try:
+            self._write_json(self._path(week_key), snapshot)
+        except Exception as e:
+            logger.warning(f"スナップショットの保存に失敗: {e}")
+
+    def result_path(self, week_key: str) -> Path:
+        return self.result_dir / f"{week_key}.json"
+
+    def load_results(self, week_key: str) -> Dict[str, Dict]:
+        """
+        週ごとに保存した分析結果を読み込む
+
+        Returns:
+            {結果種別: {"result": ..., "analyzed_at": ...}}（保存がなければ空のdict）
+        """
+        path = self.result_path(week_key)
+        if not path.exists():
+            return {}
+
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"分析結果の読み込みに失敗: {e}")
+            return {}
+
+    def save_result(self, week_key: str, kind: str, result: Dict) -> None:
+        """分析結果を結果種別（daily, weekend_v2など）ごとに保存（エクスポート用）"""
+        results = self.load_results(week_key)
+        results[kind] = {
+            "result": result,
+            "analyzed_at": datetime.now().isoformat(timespec="seconds"),
+        }
+
+        try:
+            self._write_json(self.result_path(week_key), results)
+        except Exception as e:
+            logger.warning(f"分析結果の保存に失敗: {e}")
+
+    @staticmethod
+    def _write_json(path: Path, data: Dict) -> None:
+        """一時ファイルに書いてから置き換える（書き込み途中のファイルを読まないように）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        tmp_path.replace(path)
+
+    @staticmethod
+    def compact_summary(summary: Dict) -> Dict:
+        """差分計算に必要な項目だけを取り出す"""
+        daily_log = summary.get("daily_log", {})
+        kpt = summary.get("kpt", {})
+
+        return {
+            "focus": summary.get("focus", ""),
+            "entries": [list(entry) for entry in daily_log.get("entries", [])],
+            "avg_mood": daily_log.get("avg_mood", 0),
+            "kpt": {
+                "keep": kpt.get("keep", ""),
+                "problem": kpt.get("problem", ""),
+                "try": kpt.get("try", ""),
+            },
+        }
+
+
+def compute_delta(previous: Dict, current: Dict) -> Dict:
+    """
+    前回と今回のスナップショットの差分を計算
+
+    Args:
+        previous: 前回のcompact_summary
+        current: 今回のcompact_summary
+
+    Returns:
+        {
+            "focus_changed": bool,
+            "new_entries": [(day, content, mood), ...],
+            "changed_entries": [(day, content, mood), ...],
+            "kpt_changes": {"try": (前回, 今回), ...},
+            "mood_change": (前回の平均, 今回の平均) または None
+        }
+    """
+    prev_entries = {entry[0]: tuple(entry) for entry in previous.get("entries", [])}
+    new_entries = []
+    changed_entries = []
+
+    for entry in current.get("entries", []):
+        entry = tuple(entry)
+        prev_entry = prev_entries.get(entry[0])
+        if prev_entry is None:
+            new_entries.append(entry)
+        elif prev_entry != entry:
+            changed_entries.append(entry)
+
+    prev_kpt = previous.get("kpt", {})
+    kpt_changes = {
+        key: (prev_kpt.get(key, ""), value)
+        for key, value in current.get("kpt", {}).items()
+        if prev_kpt.get(key, "") != value
+    }
+
+    prev_mood = previous.get("avg_mood", 0)
+    mood = current.get("avg_mood", 0)
+
+    return {
+        "focus_changed": previous.get("focus", "") != current.get("focus", ""),
+        "new_entries": new_entries,
+        "changed_entries": changed_entries,
+        "kpt_changes": kpt_changes,
+        "mood_change": (prev_mood, mood) if round(prev_mood, 1) != round(mood, 1) else None,
+    }
+
+
+def is_empty_delta(delta: Dict) -> bool:
+    """差分がないかどうか"""
+    return not (
+        delta["focus_changed"]
+        or delta["new_entries"]
+        or delta["changed_entries"]
+        or delta["kpt_changes"]
+        or delta["mood_change"]
+    )
@@ -0,0 +1,237 @@
+"""
+週報テンプレートの判定・パースモジュール
+
+テンプレートのバージョンを見出しから一度だけ判定し、
+バージョンごとにコンパイルした文法でセクションを切り出す
+"""
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Pattern, Tuple
+
+TEMPLATES_DIR = Path(__file__).parent.parent / "templates"
+
+# 見出し末尾の補足（例: 「（1つだけ）」「（2026）」）
+HEADING_NOTE_RE = re.compile(r"[（(][^）)]*[）)]\s*$")
+
+# 水平線（AIサマリなど一部のセクションの終端）
+HORIZONTAL_RULE_RE = re.compile(r"^-{3,}\s*$", re.MULTILINE)
+
+
+@dataclass(frozen=True)
+class SectionRule:
+    """1セクションの見出しルール"""
+
+    key: str
+    # 見出し行（記号を含む）にマッチする正規表現
+    heading: Pattern
+    # 見出しが見つからないときに追記する見出し行
+    default_heading: str
+    # 水平線（---）でもセクションを終了するか
+    stops_at_rule: bool = False
+    # 本文が引用（> ...）形式か
+    quoted: bool = False
+
+
+@dataclass
+class TemplateGrammar:
+    """テンプレート1バージョン分の文法"""
+
+    version: str
+    # 見出し行の検出用（セクションの区切りになる）
+    heading_line: Pattern
+    rules: List[SectionRule]
+    # AIの出力先・前週引き継ぎのセクションキー
+    ai_summary_key: str = "ai_summary"
+    prev_week_key: Optional[str] = None
+    rules_by_key: Dict[str, SectionRule] = field(init=False)
+
+    def __post_init__(self):
+        self.rules_by_key = {rule.key: rule for rule in self.rules}
+
+    def score(self, content: str) -> int:
+        """本文に含まれるこのテンプレートの見出しの数（バージョン判定用の指紋）"""
+        headings = self.heading_line.findall(content)
+        return sum(1 for rule in self.rules if any(rule.heading.match(h) for h in headings))
+
+    def section_spans(self, content: str) -> Dict[str, Tuple[int, int, int]]:
+        """
+        セクションごとの位置を返す
+
+        Returns:
+            {キー: (見出し行の開始位置, 本文の開始位置, 本文の終了位置)}
+            本文が空で直後に次の見出しが続く場合、終了位置は開始位置より1小さくなる
+        """
+        headings = list(self.heading_line.finditer(content))
+        spans = {}
+
+        for index, match in enumerate(headings):
+            rule = self.rule_for(match.group(0))
+            if rule is None or rule.key in spans:
+                continue
+
+            body_start = min(match.end() + 1, len(content))
+            body_end = headings[index + 1].start() - 1 if index + 1 < len(headings) else len(content)
+
+            if rule.stops_at_rule:
+                hr = HORIZONTAL_RULE_RE.search(content, body_start, max(body_end + 1, body_start))
+                if hr:
+                    body_end = hr.start() - 1
+
+            spans[rule.key] = (match.start(), body_start, max(body_end, body_start - 1))
+
+        return spans
+
+    def parse_sections(self, content: str) -> Dict[str, str]:
+        """セクションごとの本文を切り出す"""
+        sections = {}
+
+        for key, (_, start, end) in self.section_spans(content).items():
+            body = content[start:end].strip()
+            if self.rules_by_key[key].quoted:
+                body = _unquote(body)
+                if body is None:
+                    continue
+            sections[key] = body
+
+        return sections
+
+    def rule_for(self, heading: str) -> Optional[SectionRule]:
+        """見出し行に対応するセクションのルール（対象外の見出しならNone）"""
+        for rule in self.rules:
+            if rule.heading.match(heading):
+                return rule
+        return None
+
+    @classmethod
+    def from_template_file(cls, version: str, path: Path, section_keys: Dict[str, str],
+                           rule_sections: Tuple[str, ...] = (), quoted_sections: Tuple[str, ...] = (),
+                           **kwargs) -> "TemplateGrammar":
+        """
+        テンプレートファイルの「## 」見出しから文法を生成
+
+        Args:
+            version: バージョン名
+            path: テンプレートファイル
+            section_keys: {見出し名（補足を除く）: セクションキー}
+            rule_sections: 水平線でも終了するセクションキー
+            quoted_sections: 本文が引用形式のセクションキー
+        """
+        rules = []
+
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.startswith("## "):
+                    continue
+
+                heading = line.rstrip("\n")
+                name = HEADING_NOTE_RE.sub("", heading[3:]).strip()
+                key = section_keys.get(name)
+                if key is None:
+                    continue
+
+                rules.append(SectionRule(
+                    key=key,
+                    heading=re.compile(rf"##\s*{re.escape(name)}"),
+                    default_heading=heading,
+                    stops_at_rule=key in rule_sections,
+                    quoted=key in quoted_sections,
+                ))
+
+        missing = set(section_keys.values()) - {rule.key for rule in rules}
+        if missing:
+            raise ValueError(f"テンプレート {path.name} に見出しがありません: {sorted(missing)}")
+
+        return cls(version=version, heading_line=re.compile(r"^##\s.*$", re.MULTILINE), rules=rules, **kwargs)
+
+
+def _unquote(body: str) -> Optional[str]:
+    """引用形式（> ...）の本文から引用記号を外す（引用がなければNone）"""
+    if not body.startswith(">"):
+        return None
+    lines = [re.sub(r"^>\s?", "", line) for line in body.split("\n")]
+    return "\n".join(lines).strip()
+
+
+def _build_v1() -> TemplateGrammar:
+    """旧テンプレート（v1）の文法（テンプレートファイルがないため見出しを直接定義）"""
+    headings = [
+        ("desired_results", r"■今週自分が得たい結果", "■今週自分が得たい結果"),
+        ("todos", r"■今週のToDo", "■今週のToDo"),
+        ("accomplishments", r"■今週やったこと ＆ 気づき", "■今週やったこと ＆ 気づき"),
+        ("good_bad", r"■今週のGood / Bad", "■今週のGood / Bad"),
+        ("analysis", r"■上記の要因分析", "■上記の要因分析"),
+        ("ai_summary", r"■AIからの総括（振り返り）", "■AIからの総括（振り返り）"),
+        ("next_week_goals", r"■来週の目標", "■来週の目標"),
+        ("annual_goals", r"▼\d{4}年度目標", "▼年度目標"),
+    ]
+    rules = [
+        SectionRule(
+            key=key,
+            heading=re.compile(pattern),
+            default_heading=default,
+            stops_at_rule=key == "ai_summary",
+        )
+        for key, pattern, default in headings
+    ]
+    return TemplateGrammar(
+        version="v1",
+        heading_line=re.compile(r"^[■▼].*$", re.MULTILINE),
+        rules=rules,
+    )
+
+
+def _build_v2() -> TemplateGrammar:
+    """新テンプレート（v2）の文法（templates/weekly-template-v2.md から生成）"""
+    return TemplateGrammar.from_template_file(
+        "v2",
+        TEMPLATES_DIR / "weekly-template-v2.md",
+        section_keys={
+            "今週のフォーカス": "focus",
+            "デイリーログ": "daily_log",
+            "振り返り": "reflection",
+            "KPT": "kpt",
+            "前週からの引き継ぎ": "prev_week",
+            "AIサマリ": "ai_summary",
+            "年度目標": "annual_goals",
+        },
+        rule_sections=("ai_summary",),
+        quoted_sections=("focus",),
+        prev_week_key="prev_week",
+    )
+
+
+# 判定の優先順（同点の場合は先に登録したものを優先）
+TEMPLATE_REGISTRY: Dict[str, TemplateGrammar] = {}
+
+
+def register_template(grammar: TemplateGrammar) -> None:
+    """テンプレートの文法を登録（v3以降はここに追加する）"""
+    TEMPLATE_REGISTRY[grammar.version] = grammar
+
+
+register_template(_build_v2())
+register_template(_build_v1())
+
+
+def get_grammar(version: str) -> TemplateGrammar:
+    """バージョン名から文法を取得"""
+    return TEMPLATE_REGISTRY[version]
+
+
+def detect_template(content: str) -> TemplateGrammar:
+    """
+    見出しの指紋からテンプレートのバージョンを判定
+
+    登録済みテンプレートのうち、見出しが最も多く一致したものを返す
+    （どれにも一致しない場合は新テンプレートv2）
+    """
+    best = get_grammar("v2")
+    best_score = 0
+
+    for grammar in TEMPLATE_REGISTRY.values():
+        score = grammar.score(content)
+        if score > best_score:
+            best, best_score = grammar, score
+
+    return best
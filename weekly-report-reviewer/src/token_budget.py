@@ -0,0 +1,231 @@
+"""
+プロンプトのトークン予算管理モジュール
+
+セクションごとにトークン予算を割り当て、予算を超えたセクションを圧縮する
+"""
+import re
+import logging
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+try:
+    import tiktoken
+except ImportError:  # オプション依存（未インストールなら概算で代用）
+    tiktoken = None
+
+
+# セクションごとの予算配分の重み（未定義のセクションは1）
+DEFAULT_SECTION_WEIGHTS = {
+    "focus": 1,
+    "desired_results": 1,
+    "daily_log": 3,
+    "reflection": 3,
+    "accomplishments": 3,
+    "good_bad": 2,
+    "analysis": 2,
+    "todo_list": 2,
+    "kpt_keep": 1,
+    "kpt_problem": 1,
+    "kpt_try": 1,
+    "annual_goals": 1,
+}
+
+TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+TABLE_ROW_RE = re.compile(r"^\|(.*)\|$")
+BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+class TokenEstimator:
+    """トークン数の推定クラス（tiktokenがあれば使用し、なければ文字種から概算）"""
+
+    def __init__(self, model: str = "gpt-4o"):
+        self._encoding = None
+
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model)
+            except Exception:
+                try:
+                    self._encoding = tiktoken.get_encoding("o200k_base")
+                except Exception as e:
+                    logger.debug(f"tiktokenのエンコーディング取得に失敗、概算を使用します: {e}")
+
+    def count(self, text: str) -> int:
+        """テキストのトークン数を返す"""
+        if not text:
+            return 0
+
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+
+        # 概算: ASCIIは約4文字で1トークン、日本語などの非ASCIIは約1文字で1トークン
+        ascii_chars = len(text.encode("ascii", "ignore"))
+        return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+class TokenBudgeter:
+    """セクションごとのトークン予算を割り当て、超過分を圧縮するクラス"""
+
+    def __init__(self, total_budget: int, estimator: Optional[TokenEstimator] = None,
+                 weights: Optional[Dict[str, int]] = None):
+        self.total_budget = total_budget
+        self.estimator = estimator or TokenEstimator()
+        self.weights = weights or DEFAULT_SECTION_WEIGHTS
+
+    def fit(self, sections: Dict[str, str]) -> Dict[str, str]:
+        """
+        全セクションが予算内に収まるよう圧縮する
+
+        Args:
+            sections: {セクション名: テキスト}
+
+        Returns:
+            圧縮後の {セクション名: テキスト}
+        """
+        counts = {key: self.estimator.count(text) for key, text in sections.items()}
+        before_total = sum(counts.values())
+
+        if before_total <= self.total_budget:
+            logger.debug(f"プロンプトは予算内です: {before_total}/{self.total_budget} tokens")
+            return dict(sections)
+
+        budgets = self._allocate(counts)
+        fitted = {}
+
+        for key, text in sections.items():
+            if counts[key] <= budgets[key]:
+                fitted[key] = text
+                continue
+
+            fitted[key] = self.compact(text, budgets[key])
+            logger.info(
+                f"セクション '{key}' を圧縮しました: "
+                f"{counts[key]} -> {self.estimator.count(fitted[key])} tokens (予算 {budgets[key]})"
+            )
+
+        after_total = sum(self.estimator.count(text) for text in fitted.values())
+        logger.info(f"プロンプトを圧縮しました: {before_total} -> {after_total} tokens (予算 {self.total_budget})")
+
+        return fitted
+
+    def _allocate(self, counts: Dict[str, int]) -> Dict[str, int]:
+        """
+        重みに応じて予算を配分する
+
+        予算内に収まるセクションの余りは、超過しているセクションに重み順で再配分する
+        """
+        budgets = {}
+        remaining = dict(counts)
+        budget_left = self.total_budget
+
+        while remaining:
+            total_weight = sum(self.weights.get(key, 1) for key in remaining)
+            shares = {
+                key: budget_left * self.weights.get(key, 1) // total_weight
+                for key in remaining
+            }
+            fits = [key for key in remaining if remaining[key] <= shares[key]]
+
+            if not fits:
+                budgets.update(shares)
+                break
+
+            for key in fits:
+                budgets[key] = remaining.pop(key)
+                budget_left -= budgets[key]
+
+        return budgets
+
+    def compact(self, text: str, budget: int) -> str:
+        """
+        テキストを予算内に圧縮する
+
+        空白の正規化 → 重複行の除去 → テーブルの折りたたみ → 切り詰め の順に適用し、
+        予算内に収まった時点で終了する
+        """
+        for step in (self._normalize, self._dedupe_lines, self._collapse_tables):
+            text = step(text)
+            if self.estimator.count(text) <= budget:
+                return text
+
+        return self._truncate(text, budget)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        """行末の空白と連続する空行を除去"""
+        lines = [line.rstrip() for line in text.split("\n")]
+        return BLANK_LINES_RE.sub("\n\n", "\n".join(lines)).strip()
+
+    @staticmethod
+    def _dedupe_lines(text: str) -> str:
+        """重複する行を除去（最初の出現のみ残す）"""
+        seen = set()
+        lines = []
+
+        for line in text.split("\n"):
+            key = line.strip()
+            if key and key in seen:
+                continue
+            seen.add(key)
+            lines.append(line)
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def _collapse_tables(text: str) -> str:
+        """Markdownテーブルを区切り線なしの1行テキストに折りたたむ"""
+        lines = []
+
+        for line in text.split("\n"):
+            stripped = line.strip()
+            if TABLE_SEPARATOR_RE.match(stripped):
+                continue
+
+            row = TABLE_ROW_RE.match(stripped)
+            if row:
+                cells = [cell.strip() for cell in row.group(1).split("|")]
+                line = " / ".join(cell for cell in cells if cell)
+                if not line:
+                    continue
+
+            lines.append(line)
+
+        return "\n".join(lines)
+
+    def _truncate(self, text: str, budget: int) -> str:
+        """先頭と末尾を残して中間を省略する"""
+        # 省略マーカーの分をあらかじめ差し引く
+        budget -= self.estimator.count("…（9999行省略）")
+        if budget <= 0:
+            return ""
+
+        lines = text.split("\n")
+        head_budget = budget * 2 // 3
+        head, tail = [], []
+        used = 0
+
+        for line in lines:
+            cost = self.estimator.count(line) + 1
+            if used + cost > head_budget:
+                break
+            head.append(line)
+            used += cost
+
+        for line in reversed(lines[len(head):]):
+            cost = self.estimator.count(line) + 1
+            if used + cost > budget:
+                break
+            tail.insert(0, line)
+            used += cost
+
+        omitted = len(lines) - len(head) - len(tail)
+        if omitted == 0:
+            return "\n".join(head + tail)
+
+        # 1行が予算を超える場合は文字数で切り詰める
+        if not head and not tail:
+            ratio = budget / max(self.estimator.count(text), 1)
+            return text[:int(len(text) * ratio)] + "…（省略）"
+
+        return "\n".join(head + [f"…（{omitted}行省略）"] + tail)
@@ -0,0 +1,254 @@
+"""
+API利用量（トークン数・推定コスト）の台帳モジュール
+
+OpenAI APIの呼び出しごとにモデル・モード・トークン数・レイテンシ・推定コストを
+SQLiteに記録し、日次・月次の予算に対する残額を求める。
+平日チェックのローカルルールの判定は、コストの集計に混ざらないよう別のテーブルに記録する
+"""
+import sqlite3
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# 100万トークンあたりの料金（USD）: (入力, キャッシュ済み入力, 出力)
+MODEL_PRICES = {
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+# 料金表にないモデルは最も高い料金で見積もる（予算を超えない側に倒す）
+DEFAULT_PRICE = max(MODEL_PRICES.values())
+
+# Batch APIの割引率
+BATCH_DISCOUNT = 0.5
+
+def price_for(model: str):
+    """モデル名から料金を取得（日付つきのスナップショット名は前方一致で解決）"""
+    if model in MODEL_PRICES:
+        return MODEL_PRICES[model]
+
+    for name in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(name + "-"):
+            return MODEL_PRICES[name]
+
+    return DEFAULT_PRICE
+
+
+def default_db_path() -> str:
+    """台帳の保存先（USAGE_DB、未設定の場合は STATE_DIR/usage.sqlite3）"""
+    return settings.usage_db or str(Path(settings.state_dir) / "usage.sqlite3")
+
+
+def estimate_cost(model: str, prompt_tokens: int, completion_tokens: int, cached_tokens: int = 0,
+                  batch: bool = False) -> float:
+    """トークン数から推定コスト（USD）を計算"""
+    input_price, cached_price, output_price = price_for(model)
+    uncached = max(prompt_tokens - cached_tokens, 0)
+
+    cost = (uncached * input_price + cached_tokens * cached_price + completion_tokens * output_price) / 1_000_000
+    return cost * BATCH_DISCOUNT if batch else cost
+
+
+class UsageLedger:
+    """API呼び出しの利用量をSQLiteに記録するクラス"""
+
+    def __init__(self, db_path: str, daily_budget: float = 0, monthly_budget: float = 0, profile: str = ""):
+        """
+        Args:
+            db_path: SQLiteファイルのパス
+            daily_budget: 1日あたりの予算（USD、0なら無制限）
+            monthly_budget: 1ヶ月あたりの予算（USD、0なら無制限）
+            profile: 記録に付けるプロファイル名（予算は全プロファイル合計で判定）
+        """
+        self.db_path = Path(db_path)
+        self.daily_budget = daily_budget
+        self.monthly_budget = monthly_budget
+        self.profile = profile
+        self._initialized = False
+
+    @property
+    def has_budget(self) -> bool:
+        return bool(self.daily_budget or self.monthly_budget)
+
+    def _connect(self) -> sqlite3.Connection:
+        # スケジューラやバッチから並行して書き込まれるため、呼び出しごとに接続する
+        if not self._initialized:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+
+        if not self._initialized:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS api_calls (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL,
+                    profile TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    prompt_tokens INTEGER NOT NULL,
+                    completion_tokens INTEGER NOT NULL,
+                    cached_tokens INTEGER NOT NULL,
+                    latency_ms INTEGER NOT NULL,
+                    cost_usd REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_api_calls_created_at ON api_calls (created_at)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS heuristic_checks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    created_at TEXT NOT NULL,
+                    profile TEXT NOT NULL,
+                    hit INTEGER NOT NULL,
+                    latency_ms INTEGER NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_heuristic_checks_created_at ON heuristic_checks (created_at)"
+            )
+            self._initialized = True
+
+        return conn
+
+    def record(self, model: str, mode: str, prompt_tokens: int, completion_tokens: int,
+               cached_tokens: int = 0, latency: float = 0, batch: bool = False) -> float:
+        """
+        1回分のAPI呼び出しを記録
+
+        Args:
+            model: モデル名
+            mode: 結果種別（daily, weekend_v2など）
+            latency: 所要時間（秒）
+            batch: Batch API経由かどうか（割引料金で計算）
+
+        Returns:
+            推定コスト（USD）
+        """
+        cost = estimate_cost(model, prompt_tokens, completion_tokens, cached_tokens, batch)
+
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO api_calls (created_at, profile, model, mode, prompt_tokens, completion_tokens, "
+                    "cached_tokens, latency_ms, cost_usd) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        datetime.now().isoformat(timespec="seconds"),
+                        self.profile,
+                        model,
+                        f"batch:{mode}" if batch else mode,
+                        prompt_tokens,
+                        completion_tokens,
+                        cached_tokens,
+                        int(latency * 1000),
+                        cost,
+                    ),
+                )
+            conn.close()
+        except sqlite3.Error as e:
+            # 記録に失敗してもレビュー自体は止めない
+            logger.warning(f"利用量の記録に失敗: {e}")
+
+        return cost
+
+    def record_heuristic(self, hit: bool, latency: float = 0) -> None:
+        """
+        平日チェックのローカルルールの判定を記録（ヒット率の集計用）
+
+        Args:
+            hit: APIを呼ばずにローカルで処理できたかどうか（Falseなら気になる兆候がありAPIに回した）
+        """
+        try:
+            conn = self._connect()
+            with conn:
+                conn.execute(
+                    "INSERT INTO heuristic_checks (created_at, profile, hit, latency_ms) VALUES (?, ?, ?, ?)",
+                    (datetime.now().isoformat(timespec="seconds"), self.profile, int(hit), int(latency * 1000)),
+                )
+            conn.close()
+        except sqlite3.Error as e:
+            # 記録に失敗してもレビュー自体は止めない
+            logger.warning(f"ローカルルールの判定の記録に失敗: {e}")
+
+    def heuristic_hit_rate(self, since: datetime) -> Optional[float]:
+        """指定日時以降の平日チェックのうち、ローカルルールで処理できた割合（判定がなければNone）"""
+        try:
+            conn = self._connect()
+            checks, hits = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(hit), 0) FROM heuristic_checks WHERE created_at >= ?",
+                (since.isoformat(timespec="seconds"),),
+            ).fetchone()
+            conn.close()
+        except sqlite3.Error as e:
+            logger.warning(f"ローカルルールの判定の集計に失敗: {e}")
+            return None
+        return hits / checks if checks else None
+
+    def spent_since(self, since: datetime) -> float:
+        """指定日時以降の推定コストの合計（USD）"""
+        try:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT COALESCE(SUM(cost_usd), 0) FROM api_calls WHERE created_at >= ?",
+                (since.isoformat(timespec="seconds"),),
+            ).fetchone()
+            conn.close()
+            return row[0]
+        except sqlite3.Error as e:
+            logger.warning(f"利用量の集計に失敗: {e}")
+            return 0.0
+
+    def remaining(self, now: Optional[datetime] = None) -> Optional[float]:
+        """
+        日次・月次の予算の残額のうち小さい方（USD）
+
+        Returns:
+            残額（予算が設定されていなければNone）
+        """
+        if not self.has_budget:
+            return None
+
+        now = now or datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        remaining = []
+
+        if self.daily_budget:
+            remaining.append(self.daily_budget - self.spent_since(today))
+        if self.monthly_budget:
+            remaining.append(self.monthly_budget - self.spent_since(today.replace(day=1)))
+
+        return min(remaining)
+
+    def summary(self, since: datetime) -> Dict[str, Dict]:
+        """
+        指定日時以降のモデル・モード別の集計
+
+        Returns:
+            {"モデル/モード": {"calls", "prompt_tokens", "completion_tokens", "cached_tokens", "cost_usd"}}
+        """
+        conn = self._connect()
+        rows = conn.execute(
+            "SELECT model, mode, COUNT(*), SUM(prompt_tokens), SUM(completion_tokens), SUM(cached_tokens), "
+            "SUM(cost_usd) FROM api_calls WHERE created_at >= ? GROUP BY model, mode ORDER BY model, mode",
+            (since.isoformat(timespec="seconds"),),
+        ).fetchall()
+        conn.close()
+
+        return {
+            f"{model}/{mode}": {
+                "calls": calls,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "cached_tokens": cached_tokens,
+                "cost_usd": cost,
+            }
+            for model, mode, calls, prompt_tokens, completion_tokens, cached_tokens, cost in rows
+        }
@@ -3,103 +3,150 @@ Obsidian Vaultから週報を読み込むモジュール
 """
 import os
 import re
+import logging
+from functools import partial
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Callable, Optional, Dict, Iterable, List, Tuple
 
+from src.parse_guard import ParseGuard
+from src.partial_reader import PartialReader
+from src.templates import TemplateGrammar, detect_template, get_grammar
 
-class WeeklyReport:
-    """週報データクラス"""
+logger = logging.getLogger(__name__)
 
-    def __init__(self, file_path: str, content: str):
-        self.file_path = file_path
-        self.content = content
-        self.sections = self._parse_sections(content)
-        self.todos = self._parse_todos()
-
-    def _parse_sections(self, content: str) -> Dict[str, str]:
-        """セクションごとにパース（新旧テンプレート両対応）"""
-        sections = {}
-
-        # 新テンプレート（v2）のセクション定義
-        v2_patterns = [
-            ("focus", r"## 今週のフォーカス.*?\n>(.*?)(?=\n##|\Z)"),
-            ("daily_log", r"## デイリーログ\n(.*?)(?=\n##|\Z)"),
-            ("reflection", r"## 振り返り.*?\n(.*?)(?=\n##|\Z)"),
-            ("kpt", r"## KPT\n(.*?)(?=\n##|\Z)"),
-            ("prev_week", r"## 前週からの引き継ぎ\n(.*?)(?=\n##|\Z)"),
-            ("ai_summary", r"## AIサマリ\n(.*?)(?=\n##|---|\Z)"),
-            ("annual_goals", r"## 年度目標.*?\n(.*?)(?=\n##|\Z)"),
-        ]
-
-        # 旧テンプレート（v1）のセクション定義（後方互換性）
-        v1_patterns = [
-            ("desired_results", r"■今週自分が得たい結果\n(.*?)(?=\n■|\Z)"),
-            ("todos", r"■今週のToDo\n(.*?)(?=\n■|\Z)"),
-            ("accomplishments", r"■今週やったこと ＆ 気づき\n(.*?)(?=\n■|\Z)"),
-            ("good_bad", r"■今週のGood / Bad\n(.*?)(?=\n■|\Z)"),
-            ("analysis", r"■上記の要因分析\n(.*?)(?=\n■|\Z)"),
-            ("ai_summary_v1", r"■AIからの総括（振り返り）\n(.*?)(?=\n■|\Z)"),
-            ("next_week_goals", r"■来週の目標\n(.*?)(?=\n■|\Z)"),
-            ("annual_goals_v1", r"▼2026年度目標（変動あり）\n(.*?)(?=\n▼|\Z)"),
-        ]
-
-        # 新テンプレートを優先的にパース
-        for key, pattern in v2_patterns:
-            match = re.search(pattern, content, re.DOTALL)
-            if match:
-                sections[key] = match.group(1).strip()
+DAYS_OF_WEEK = "月火水木金土日"
+# 曜日セルの判定用（文字列の部分一致では空セルや「月火」も通ってしまうため、1文字ずつの集合にする）
+DAY_CELLS = frozenset(DAYS_OF_WEEK)
+MOOD_CELL_RE = re.compile(r"\s*(\d+)/5\s*$")
+TODO_RE = re.compile(r"^- \[[ x]\]")
+KPT_ITEM_RE = re.compile(
+    r"-\s*\*\*(?:(Keep)[（(]続ける[)）]|(Problem)[（(]課題[)）]|(Try)[（(]来週試す[)）])\*\*:\s*(.*)"
+)
 
-        # 旧テンプレートも試す（後方互換性）
-        for key, pattern in v1_patterns:
-            match = re.search(pattern, content, re.DOTALL)
-            if match:
-                sections[key] = match.group(1).strip()
 
-        # 旧テンプレートのai_summaryがあれば新キーに統合
-        if "ai_summary_v1" in sections and "ai_summary" not in sections:
-            sections["ai_summary"] = sections["ai_summary_v1"]
+@dataclass
+class DailyLog:
+    """デイリーログのパース結果（各行は (曜日, 内容, 調子) のタプル）"""
 
-        # 旧テンプレートのannual_goalsがあれば新キーに統合
-        if "annual_goals_v1" in sections and "annual_goals" not in sections:
-            sections["annual_goals"] = sections["annual_goals_v1"]
+    __slots__ = ("entries", "avg_mood")
+    entries: Tuple[Tuple[str, str, int], ...]
+    avg_mood: float
 
-        return sections
+    def as_dict(self) -> Dict:
+        return {"entries": list(self.entries), "avg_mood": self.avg_mood}
 
-    def _parse_todos(self) -> Tuple[int, int, List[str]]:
-        """
-        ToDoをパースして完了数/総数を返す
 
-        Returns:
-            (完了数, 総数, ToDoリスト)
-        """
+@dataclass
+class Kpt:
+    """KPTのパース結果"""
+
+    __slots__ = ("keep", "problem", "try_")
+    keep: str
+    problem: str
+    try_: str
+
+    def as_dict(self) -> Dict:
+        return {"keep": self.keep, "problem": self.problem, "try": self.try_}
+
+
+@dataclass
+class Todos:
+    """ToDoのパース結果"""
+
+    __slots__ = ("completed", "total", "items")
+    completed: int
+    total: int
+    items: Tuple[str, ...]
+
+
+class WeeklyReport:
+    """
+    週報データクラス
+
+    テンプレートの判定・セクション・ToDo・デイリーログ・KPTは初めて参照されたときに
+    一度だけパースしてキャッシュする。多数の週を保持しても軽いよう、__slots__で属性を固定し、
+    セクションに分割した時点で元の本文（content）は手放してNoneにする
+    （以降の項目はすべてセクションから求めるため。本文が必要なら週報ファイルを読み直す）。
+    """
+
+    # 文法はバージョン名だけを持つ（子プロセスからpickleで受け取るたびに文法の複製を抱えないため）
+    __slots__ = ("file_path", "content", "degraded", "_version", "_sections", "_todos", "_daily_log", "_kpt")
+
+    def __init__(self, file_path: str, content: str):
+        self.file_path = file_path
+        self.content: Optional[str] = content
+        # サイズ上限・制限時間により縮退したパース結果かどうか
+        self.degraded = False
+        self._version: Optional[str] = None
+        self._sections: Optional[Dict[str, str]] = None
+        self._todos: Optional[Todos] = None
+        self._daily_log: Optional[DailyLog] = None
+        self._kpt: Optional[Kpt] = None
+
+    @property
+    def grammar(self) -> TemplateGrammar:
+        """テンプレートの文法（見出しから一度だけ判定する）"""
+        if self._version is None:
+            self._version = detect_template(self.content).version
+        return get_grammar(self._version)
+
+    @property
+    def template_version(self) -> str:
+        return self.grammar.version
+
+    @property
+    def unreadable(self) -> bool:
+        """縮退により本文を読めず、どのセクションも取り出せなかったかどうか（分析・書き込みの対象外）"""
+        return self.degraded and not any(body.strip() for body in self.sections.values())
+
+    @property
+    def sections(self) -> Dict[str, str]:
+        """判定したテンプレートの文法でセクションごとにパースした本文"""
+        if self._sections is None:
+            self._sections = self.grammar.parse_sections(self.content)
+            # 本文はセクションと重複するため、分割後は保持しない
+            self.content = None
+        return self._sections
+
+    @property
+    def todos(self) -> Todos:
+        if self._todos is None:
+            self._todos = self._parse_todos()
+        return self._todos
+
+    @property
+    def daily_log(self) -> DailyLog:
+        if self._daily_log is None:
+            self._daily_log = self._parse_daily_log()
+        return self._daily_log
+
+    @property
+    def kpt(self) -> Kpt:
+        if self._kpt is None:
+            self._kpt = self._parse_kpt()
+        return self._kpt
+
+    def _parse_todos(self) -> Todos:
+        """ToDoをパースして完了数/総数を返す"""
         todo_section = self.sections.get("todos", "")
         lines = todo_section.split("\n")
 
         todos = []
         completed = 0
-        total = 0
 
         for line in lines:
             # チェックボックス形式を検出
-            if re.match(r"^- \[[ x]\]", line):
-                total += 1
+            if TODO_RE.match(line):
                 todos.append(line)
                 if "[x]" in line or "[X]" in line:
                     completed += 1
 
-        return completed, total, todos
+        return Todos(completed, len(todos), tuple(todos))
 
-    def _parse_daily_log(self) -> Dict:
-        """
-        デイリーログをパース
-
-        Returns:
-            {
-                "entries": [(day, content, mood), ...],
-                "avg_mood": 平均気分スコア
-            }
-        """
+    def _parse_daily_log(self) -> DailyLog:
+        """デイリーログをパース"""
         daily_log_section = self.sections.get("daily_log", "")
         entries = []
         mood_scores = []
@@ -108,92 +155,101 @@ class WeeklyReport:
         lines = daily_log_section.split("\n")
         for line in lines:
             # | 月 | やったこと | 3/5 | の形式を検出
-            match = re.match(r"\|\s*([月火水木金土日])\s*\|\s*(.*?)\s*\|\s*(\d+)/5\s*\|", line)
-            if match:
-                day, content, mood = match.groups()
-                entries.append((day, content.strip(), int(mood)))
-                mood_scores.append(int(mood))
+            # （長い空白で正規表現がバックトラックしないよう、セルに分割してから判定する）
+            if not line.startswith("|"):
+                continue
+
+            cells = line.split("|")
+            day = cells[1].strip()
+            if day not in DAY_CELLS:
+                continue
+
+            # 内容に「|」が含まれていてもよいよう、最初に「n/5」となる列を調子とみなす
+            for index in range(3, len(cells) - 1):
+                mood_match = MOOD_CELL_RE.match(cells[index])
+                if mood_match:
+                    content = "|".join(cells[2:index]).strip()
+                    mood = int(mood_match.group(1))
+                    entries.append((day, content, mood))
+                    mood_scores.append(mood)
+                    break
 
         avg_mood = sum(mood_scores) / len(mood_scores) if mood_scores else 0
 
-        return {
-            "entries": entries,
-            "avg_mood": avg_mood
-        }
+        return DailyLog(tuple(entries), avg_mood)
 
-    def _parse_kpt(self) -> Dict:
+    def _parse_kpt(self) -> Kpt:
+        """KPTセクションをパース"""
+        kpt_section = self.sections.get("kpt", "")
+        items = {}
+        current = None
+
+        # Keep/Problem/Tryを抽出（項目は次の「-」で始まる行まで続く）
+        for line in kpt_section.split("\n"):
+            match = KPT_ITEM_RE.search(line) if "**" in line else None
+            if match:
+                key = next(label for label in match.groups()[:3] if label).lower()
+                current = key if key not in items else None
+                if current is not None:
+                    items[current] = [match.group(4)]
+            elif line.startswith("-"):
+                current = None
+            elif current is not None:
+                items[current].append(line)
+
+        return Kpt(*("\n".join(items.get(key, [])).strip() for key in ("keep", "problem", "try")))
+
+    def get_summary(self, fields: Optional[Iterable[str]] = None) -> Dict:
         """
-        KPTセクションをパース
+        要約情報を取得（新旧テンプレート対応）
+
+        Args:
+            fields: 取得する項目（SUMMARY_FIELDSのキー、省略時はすべて）。
+                指定した項目に必要な部分だけをパースする
 
         Returns:
-            {
-                "keep": str,
-                "problem": str,
-                "try": str
-            }
+            項目名をキーとするdict
         """
-        kpt_section = self.sections.get("kpt", "")
+        if fields is None:
+            fields = SUMMARY_FIELDS
 
-        keep = ""
-        problem = ""
-        try_item = ""
-
-        # Keep/Problem/Tryを抽出
-        keep_match = re.search(r"-\s*\*\*Keep[（(]続ける[)）]\*\*:\s*(.*?)(?=\n-|\Z)", kpt_section, re.DOTALL)
-        problem_match = re.search(r"-\s*\*\*Problem[（(]課題[)）]\*\*:\s*(.*?)(?=\n-|\Z)", kpt_section, re.DOTALL)
-        try_match = re.search(r"-\s*\*\*Try[（(]来週試す[)）]\*\*:\s*(.*?)(?=\n-|\Z)", kpt_section, re.DOTALL)
-
-        if keep_match:
-            keep = keep_match.group(1).strip()
-        if problem_match:
-            problem = problem_match.group(1).strip()
-        if try_match:
-            try_item = try_match.group(1).strip()
-
-        return {
-            "keep": keep,
-            "problem": problem,
-            "try": try_item
-        }
-
-    def get_summary(self) -> Dict:
-        """要約情報を取得（新旧テンプレート対応）"""
-        completed, total, todos = self.todos
-        daily_log = self._parse_daily_log()
-        kpt = self._parse_kpt()
-
-        # 新テンプレート項目
-        summary = {
-            "file_path": self.file_path,
-            "focus": self.sections.get("focus", ""),
-            "daily_log": daily_log,
-            "reflection": self.sections.get("reflection", ""),
-            "kpt": kpt,
-            "prev_week": self.sections.get("prev_week", ""),
-            "ai_summary": self.sections.get("ai_summary", ""),
-            "annual_goals": self.sections.get("annual_goals", ""),
-        }
-
-        # 旧テンプレート項目（後方互換性）
-        summary.update({
-            "desired_results": self.sections.get("desired_results", ""),
-            "accomplishments": self.sections.get("accomplishments", ""),
-            "good_bad": self.sections.get("good_bad", ""),
-            "analysis": self.sections.get("analysis", ""),
-            "next_week_goals": self.sections.get("next_week_goals", ""),
-            "todo_completed": completed,
-            "todo_total": total,
-            "todo_list": todos,
-        })
-
-        return summary
+        try:
+            return {name: SUMMARY_FIELDS[name](self) for name in fields}
+        except KeyError as e:
+            raise ValueError(f"サマリにない項目です: {e.args[0]}") from None
+
+
+# サマリの項目と取得方法（旧テンプレート項目は後方互換性のため残す）
+SUMMARY_FIELDS: Dict[str, Callable[[WeeklyReport], object]] = {
+    # 新テンプレート項目
+    "file_path": lambda report: report.file_path,
+    "template_version": lambda report: report.template_version,
+    "focus": lambda report: report.sections.get("focus", ""),
+    "daily_log": lambda report: report.daily_log.as_dict(),
+    "reflection": lambda report: report.sections.get("reflection", ""),
+    "kpt": lambda report: report.kpt.as_dict(),
+    "prev_week": lambda report: report.sections.get("prev_week", ""),
+    "ai_summary": lambda report: report.sections.get("ai_summary", ""),
+    "annual_goals": lambda report: report.sections.get("annual_goals", ""),
+    # 旧テンプレート項目
+    "desired_results": lambda report: report.sections.get("desired_results", ""),
+    "accomplishments": lambda report: report.sections.get("accomplishments", ""),
+    "good_bad": lambda report: report.sections.get("good_bad", ""),
+    "analysis": lambda report: report.sections.get("analysis", ""),
+    "next_week_goals": lambda report: report.sections.get("next_week_goals", ""),
+    "todo_completed": lambda report: report.todos.completed,
+    "todo_total": lambda report: report.todos.total,
+    "todo_list": lambda report: list(report.todos.items),
+}
 
 
 class VaultReader:
     """Obsidian Vaultから週報を読み込むクラス"""
 
-    def __init__(self, vault_path: str):
+    def __init__(self, vault_path: str, guard: Optional[ParseGuard] = None):
         self.vault_path = Path(vault_path)
+        self.guard = guard or ParseGuard()
+        self.partial_reader = PartialReader(self.guard.max_bytes, self.guard.max_line_chars)
 
         if not self.vault_path.exists():
             raise ValueError(f"Vaultパスが存在しません: {vault_path}")
@@ -216,6 +272,15 @@ class VaultReader:
         else:
             return None
 
+    def list_weekly_files(self) -> List[str]:
+        """
+        Vault内の週報ファイルを古い順に一覧する
+
+        ファイル形式: 2026-W02.md (ISO週番号形式)
+        """
+        files = self.vault_path.glob("[0-9][0-9][0-9][0-9]-W[0-9][0-9].md")
+        return [str(path) for path in sorted(files)]
+
     def get_previous_week_file(self) -> Optional[str]:
         """
         前週の週報ファイルパスを取得
@@ -237,12 +302,14 @@ class VaultReader:
         else:
             return None
 
-    def read_weekly_report(self, file_path: Optional[str] = None) -> Optional[WeeklyReport]:
+    def read_weekly_report(self, file_path: Optional[str] = None,
+                           fields: Optional[Iterable[str]] = None) -> Optional[WeeklyReport]:
         """
         週報を読み込む
 
         Args:
             file_path: ファイルパス（Noneの場合は今週のファイルを自動取得）
+            fields: 読み込み時（制限時間内）にパースしておくサマリの項目（省略時はすべて）
 
         Returns:
             WeeklyReportオブジェクト、またはNone
@@ -254,19 +321,41 @@ class VaultReader:
             return None
 
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                content = f.read()
-
-            return WeeklyReport(file_path, content)
+            # 必要なセクションを読み終えた時点で打ち切り、巨大なファイルも全体は読み込まない
+            content, truncated, incomplete = self.partial_reader.read(file_path)
+            if incomplete:
+                logger.warning(f"週報が上限を超えたため、必要なセクションを読み切れませんでした: {file_path}")
+            elif truncated:
+                logger.info(f"週報の長すぎる行・末尾を切り詰めました（必要なセクションは読み込み済み）: {file_path}")
+
+            report, degraded = self.guard.parse(
+                # 制限時間つきのパースは子プロセスで行うため、pickle可能なpartialで渡す
+                partial(VaultReader._build_report, file_path, fields=tuple(fields) if fields is not None else None),
+                content,
+                label=file_path
+            )
+            # 長すぎる行を切り詰めただけならセクションは揃っているため、劣化扱いにしない
+            report.degraded = degraded or incomplete
+            return report
 
         except Exception as e:
             print(f"週報の読み込みエラー: {e}")
             return None
 
-    def read_previous_week_report(self) -> Optional[WeeklyReport]:
+    @staticmethod
+    def _build_report(file_path: str, content: str, fields: Optional[Iterable[str]] = None) -> WeeklyReport:
+        """WeeklyReportを生成し、必要なサマリの項目まで一度パースしておく（制限時間の計測対象にする）"""
+        report = WeeklyReport(file_path, content)
+        report.get_summary(fields)
+        return report
+
+    def read_previous_week_report(self, fields: Optional[Iterable[str]] = None) -> Optional[WeeklyReport]:
         """
         前週の週報を読み込む
 
+        Args:
+            fields: 読み込み時にパースしておくサマリの項目（省略時はすべて）
+
         Returns:
             前週のWeeklyReportオブジェクト、またはNone
         """
@@ -274,4 +363,4 @@ class VaultReader:
         if prev_file is None:
             return None
 
-        return self.read_weekly_report(prev_file)
+        return self.read_weekly_report(prev_file, fields)
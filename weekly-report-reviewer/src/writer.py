@@ -1,13 +1,15 @@
 """
 週報ファイルへの書き込みモジュール
 """
-import re
 import shutil
 import logging
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional
 from datetime import datetime
 
+from src.run_lock import RunLockTimeout, week_flight
+from src.templates import TemplateGrammar, detect_template, get_grammar
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,7 +17,8 @@ class MarkdownWriter:
     """Markdown週報ファイルへの書き込みクラス"""
 
     @staticmethod
-    def update_ai_summary(file_path: str, analysis_result: Dict, is_weekend: bool = False) -> bool:
+    def update_ai_summary(file_path: str, analysis_result: Dict, is_weekend: bool = False,
+                          template_version: Optional[str] = None) -> bool:
         """
         AIサマリセクションを更新（新旧テンプレート対応）
 
@@ -23,6 +26,7 @@ class MarkdownWriter:
             file_path: 週報ファイルのパス
             analysis_result: analyzer.pyからの分析結果
             is_weekend: 週末モード（詳細評価）かどうか
+            template_version: 判定済みのテンプレートバージョン（Noneの場合はここで判定）
 
         Returns:
             成功したらTrue
@@ -35,17 +39,16 @@ class MarkdownWriter:
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
 
-            # 新しいセクション内容を生成
-            new_summary = MarkdownWriter._format_summary(analysis_result, is_weekend, content)
+            grammar = get_grammar(template_version) if template_version else detect_template(content)
 
-            # テンプレートバージョンを判定
-            is_v2 = "## AIサマリ" in content
-            section_header = "## AIサマリ" if is_v2 else "■AIからの総括（振り返り）"
+            # 新しいセクション内容を生成
+            new_summary = MarkdownWriter._format_summary(analysis_result, is_weekend, grammar.version)
 
             # セクションを置換
             updated_content = MarkdownWriter._replace_section(
                 content,
-                section_header,
+                grammar,
+                grammar.ai_summary_key,
                 new_summary
             )
 
@@ -61,10 +64,39 @@ class MarkdownWriter:
             return False
 
     @staticmethod
-    def _format_summary(result: Dict, is_weekend: bool, content: str) -> str:
+    def apply_bulk(results: Dict[str, Dict], is_weekend: bool = False,
+                   vault_path: Optional[str] = None) -> Dict[str, bool]:
+        """
+        複数の週報にまとめて分析結果を書き込む
+
+        定時実行と同じ週の書き込みが重ならないよう、週報ごとにVault・週のロックを取ってから書き込む
+
+        Args:
+            results: {週報ファイルのパス: 分析結果}
+            is_weekend: 週末モード（詳細評価）かどうか
+            vault_path: ロックのキーにするVaultのパス（省略時は週報ファイルのあるディレクトリ）
+
+        Returns:
+            {週報ファイルのパス: 成功したらTrue}
+        """
+        statuses = {}
+        for file_path, analysis_result in results.items():
+            try:
+                with week_flight(vault_path or str(Path(file_path).parent), file_path, is_weekend, reuse=False):
+                    statuses[file_path] = MarkdownWriter.update_ai_summary(file_path, analysis_result, is_weekend)
+            except RunLockTimeout as e:
+                logger.error(f"週報への書き込みをスキップしました: {e}")
+                statuses[file_path] = False
+
+        succeeded = sum(statuses.values())
+        logger.info(f"{succeeded}/{len(statuses)}件の週報を更新しました")
+        return statuses
+
+    @staticmethod
+    def _format_summary(result: Dict, is_weekend: bool, template_version: str) -> str:
         """分析結果をMarkdown形式にフォーマット（新旧テンプレート対応）"""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-        is_v2 = "## AIサマリ" in content
+        is_v2 = template_version != "v1"
 
         if is_weekend:
             suggestions = result.get("next_week_suggestions", [])
@@ -118,51 +150,66 @@ class MarkdownWriter:
 {result.get('message', 'リマインドなし')}{mood_line}"""
 
     @staticmethod
-    def _replace_section(content: str, section_header: str, new_content: str) -> str:
+    def _replace_section(content: str, grammar: TemplateGrammar, key: str, new_content: str) -> str:
         """
         セクションの内容を置換
 
         Args:
             content: 元のMarkdown全体
-            section_header: セクションヘッダー（例: "■AIからの総括（振り返り）"）
+            grammar: テンプレートの文法
+            key: セクションキー（例: "ai_summary"）
             new_content: 新しいセクション内容
 
         Returns:
             更新されたMarkdown
         """
-        # セクションヘッダーから次の■またはファイル末尾までを置換
-        pattern = rf"({re.escape(section_header)})\n(.*?)(?=\n■|\n---|\Z)"
+        span = grammar.section_spans(content).get(key)
 
-        def replacer(match):
-            return f"{match.group(1)}\n{new_content}\n"
+        # セクションが存在しない場合は末尾に追加
+        if span is None:
+            section_header = grammar.rules_by_key[key].default_heading
+            logger.warning(f"セクション '{section_header}' が見つかりませんでした。末尾に追加します。")
+            return content + f"\n\n{section_header}\n{new_content}\n"
 
-        updated = re.sub(pattern, replacer, content, flags=re.DOTALL)
+        # 見出しの次の行から次の見出し（または終端）の直前までを置換
+        _, start, end = span
+        # 見出しがファイル末尾にあり改行がない場合
+        if content[start - 1:start] != "\n":
+            return content[:start] + f"\n{new_content}\n" + content[end:]
 
-        # もし置換されなかった場合（セクションが存在しない）、セクションを追加
-        if updated == content:
-            logger.warning(f"セクション '{section_header}' が見つかりませんでした。末尾に追加します。")
-            updated = content + f"\n\n{section_header}\n{new_content}\n"
+        # 本文が空で、見出しの直後に次の見出しが続く場合
+        if end < start:
+            return content[:start] + f"{new_content}\n\n" + content[start:]
 
-        return updated
+        return content[:start] + f"{new_content}\n" + content[end:]
 
     @staticmethod
-    def update_prev_week_section(file_path: str, prev_week_kpt: Dict) -> bool:
+    def update_prev_week_section(file_path: str, prev_week_kpt: Dict,
+                                 template_version: Optional[str] = None) -> bool:
         """
         前週からの引き継ぎセクションを更新（新テンプレートv2のみ）
 
         Args:
             file_path: 今週の週報ファイルのパス
             prev_week_kpt: 前週のKPT情報 {"keep": str, "problem": str, "try": str}
+            template_version: 判定済みのテンプレートバージョン（Noneの場合はここで判定）
 
         Returns:
             成功したらTrue
         """
+        # 引き継ぎセクションのないテンプレートはファイルを開かずにスキップ
+        if template_version and get_grammar(template_version).prev_week_key is None:
+            logger.info("旧テンプレートのため、前週引き継ぎをスキップします")
+            return True
+
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 content = f.read()
 
-            # 新テンプレート（v2）の場合のみ更新
-            if "## 前週からの引き継ぎ" not in content:
+            grammar = get_grammar(template_version) if template_version else detect_template(content)
+
+            # 引き継ぎセクションがある場合のみ更新
+            if grammar.prev_week_key is None or grammar.prev_week_key not in grammar.section_spans(content):
                 logger.info("旧テンプレートのため、前週引き継ぎをスキップします")
                 return True
 
@@ -178,7 +225,8 @@ class MarkdownWriter:
             # セクションを更新
             updated_content = MarkdownWriter._replace_section(
                 content,
-                "## 前週からの引き継ぎ",
+                grammar,
+                grammar.prev_week_key,
                 prev_content
             )
 